@@ -1,6 +1,6 @@
 import codecs
 from datetime import timedelta, datetime
-from typing import Any
+from typing import Any, Callable
 from fastapi_camelcase import CamelModel
 from pydantic import Json
 import json
@@ -125,6 +125,24 @@ class VisualCrossingAdapter(BaseAdapter):
 
         return resp
 
+    def _format_resp_data_list(self, data: Any) -> list[GetWeatherLogResponseData]:
+        '''format every day of a multi day response, one line per day after header'''
+        try:
+            content = codecs.decode(data, 'utf-8')
+            logging.info(f"visual reponse content:{content}")
+            content = [line for line in content.split("\n") if len(line.strip()) > 0]
+            resp_header = self._clean_header(content[0])
+            resp = []
+            for line in content[1:]:
+                resp_dict = dict(zip(resp_header, self._format_resp(line)))
+                date_time = datetime.strptime(resp_dict.pop("date_time").strip('"'), _RESP_DATE_TIME_FORMAT)
+                resp_dict.update({"date_time": date_time})
+                resp.append(GetWeatherLogResponseData(**resp_dict))
+        except (ValueError, IndexError):
+            logging.info("visual crossing has no data for this location")
+            raise ThirdServiceException()
+        return resp
+
     def _prepare_list_request(self, req: GetWeatherRequest) -> list[_GetWeatherRequest]:
         '''
         we will split an request to a list of multiple request with time delta = 1 because we only have limited api quota per day
@@ -145,14 +163,18 @@ class VisualCrossingAdapter(BaseAdapter):
         return list_req
 
     def get_single_weather_log_data(self, req: _GetWeatherRequest) -> GetWeatherLogResponse:
+        return self._get_weather_log_data(req, lambda data: [self._format_resp_data(data)])
+
+    def _get_weather_log_data(self, req: _GetWeatherRequest,
+                              format_resp_data: Callable[[Any], list[GetWeatherLogResponseData]]) -> GetWeatherLogResponse:
         base_resp = self.get(end_point=_GET_WEATHER_LOG_END_POINT, params=req)
         try:
             # in case we run out of api key, they return success status with message, they only return error code when something occur
             # handle detect out of api key in format resp data function
             if base_resp.code == SUCCESS_STATUS_CODE:
 
-                data = self._format_resp_data(base_resp.data)
-                return GetWeatherLogResponse(code=base_resp.code, message=base_resp.message, data=[data])
+                data = format_resp_data(base_resp.data)
+                return GetWeatherLogResponse(code=base_resp.code, message=base_resp.message, data=data)
             else:
                 logging.info("visual crossing encounter error")
                 raise ThirdServiceException()
@@ -169,8 +191,8 @@ class VisualCrossingAdapter(BaseAdapter):
         req.key = self.current_key
         base_resp = self.get(end_point=_GET_WEATHER_LOG_END_POINT, params=req)
         if base_resp.code == SUCCESS_STATUS_CODE:
-            data = self._format_resp_data(base_resp.data)
-            return GetWeatherLogResponse(code=base_resp.code, message=base_resp.message, data=[data])
+            data = format_resp_data(base_resp.data)
+            return GetWeatherLogResponse(code=base_resp.code, message=base_resp.message, data=data)
         else:
             return GetWeatherLogResponse(**base_resp.dict())
 
@@ -187,5 +209,14 @@ class VisualCrossingAdapter(BaseAdapter):
         resp.code = SUCCESS_STATUS_CODE
         return resp
 
+    def get_weather_log_in_range(self, base_req: GetWeatherRequest) -> GetWeatherLogResponse:
+        '''
+        get every day from start date to end date, both included, in one request
+        only use it for short range as a failed request waste quota of every day in it
+        '''
+        req = _GetWeatherRequest(base_req)
+        req.key = self.current_key
+        return self._get_weather_log_data(req, self._format_resp_data_list)
+
 
 visual_crossing_adapter = VisualCrossingAdapter(name=_NAME, url=_URL)
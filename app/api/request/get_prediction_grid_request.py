@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+from fastapi_camelcase import CamelModel
+from pydantic import Field, validator
+
+from app.api.request.get_summary_request import Location
+from app.config import env_var
+
+
+class GetPredictionGridRequest(CamelModel):
+    locations: list[Location] = Field(default_factory=list, description="location code or coordinate of each row")
+    start_time: int = Field(default_factory=lambda: (datetime.now()-timedelta(days=7)).timestamp())  # timestamp
+    end_time: int = Field(default_factory=lambda: datetime.now().timestamp(), description="excluded")
+
+    @validator("locations")
+    def check_number_of_locations(cls, locations: list[Location]) -> list[Location]:
+        if len(locations) > env_var.PREDICTION_GRID_MAX_LOCATIONS:
+            raise ValueError(f"at most {env_var.PREDICTION_GRID_MAX_LOCATIONS} locations")
+        return locations
+
+    @validator("end_time")
+    def check_number_of_days(cls, end_time: int, values: dict) -> int:
+        start_time = values.get("start_time")
+        if start_time is not None and (end_time - start_time) // 86400 > env_var.PREDICTION_GRID_MAX_DAYS:
+            raise ValueError(f"at most {env_var.PREDICTION_GRID_MAX_DAYS} days")
+        return end_time
@@ -0,0 +1,25 @@
+from typing import Optional
+from fastapi_camelcase import CamelModel
+from pydantic import Field
+
+from app.api.response.base import BaseResponse
+from app.api.response.common import Rate
+
+
+class PredictionGridLocation(CamelModel):
+    idx: int = None
+    location_code: str = None
+    lat: float = None
+    lng: float = None
+
+
+class PredictionGridData(CamelModel):
+    dates: list[int] = Field(default_factory=list, description="date of each column")
+    locations: list[PredictionGridLocation] = Field(default_factory=list, description="location of each row")
+    values: list[list[Optional[float]]] = Field(
+        default_factory=list, description="prediction of location at date, None if location has no weather data")
+    rates: list[list[Optional[Rate]]] = Field(default_factory=list)
+
+
+class GetPredictionGridResponse(BaseResponse):
+    data: PredictionGridData = Field(default_factory=PredictionGridData)
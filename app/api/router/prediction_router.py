@@ -2,13 +2,14 @@ from http import HTTPStatus
 import logging
 import uuid
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile
 from botocore.exceptions import ClientError
 
 from app.adapter.file_service import file_service_adapter
 from app.api.response.base import BaseResponse
 from app.common.constant import ALLOW_FILE_EXTENSION
 from app.common.exception import ThirdServiceException
+from app.config import env_var
 from app.internal.dao import db
 from app.internal.dao.synced_file import SyncedFile
 from app.internal.repository.synced_file import synced_file_repo
@@ -17,11 +18,16 @@ from app.internal.util.time_util import time_util
 from app.middleware.router.router import CustomAPIRouter
 from app.api.response.get_prediction_response import GetPredictionResponse
 from app.api.request.get_prediction_request import GetPredictionRequest
+from app.api.request.get_prediction_grid_request import GetPredictionGridRequest
+from app.api.response.get_prediction_grid_response import GetPredictionGridResponse
 from app.api.request.get_weather_detail_request import GetWeatherDetailRequest
 from app.api.response.get_weather_detail_response import GetWeatherDetailResponse
 from app.api.request.get_summary_request import GetWeatherSummaryRequest
 from app.api.response.get_summary_response import GetHCMCProviceSummaryResponse, GetWeatherSummaryResponse
 from app.common.context import Context, get_context
+from app.internal.model.model.prediction_cache import prediction_cache
+from app.internal.model.model.weather_log_cache import weather_log_cache
+from app.internal.service.cache import heatmap_tile_cache, quartile_cache
 
 prediction_router = CustomAPIRouter()
 
@@ -70,6 +76,42 @@ def get_weather_detail(request: GetWeatherDetailRequest, db_session: Session = D
         db_session.commit()
 
 
+@prediction_router.post("/prediction/grid", response_model=GetPredictionGridResponse)
+def get_prediction_grid(request: GetPredictionGridRequest, db_session: Session = Depends(
+        db.get_db_session), ctx: Context = Depends(get_context)):
+    try:
+        logging.info("api prediction grid")
+        ctx.attach_db_session(db_session)
+        return service.get_prediction_grid(ctx, request)
+    except Exception as e:
+        db_session.rollback()
+        raise e
+    finally:
+        db_session.commit()
+
+
+@prediction_router.get("/prediction/tile/{z}/{x}/{y}")
+def get_heatmap_tile(z: int, x: int, y: int, date: int = None, if_none_match: str = Header(None),
+                     db_session: Session = Depends(db.get_db_session), ctx: Context = Depends(get_context)):
+    '''pre rendered heatmap tile of the day, pixel x uint8, pixel y uint8, weight float32 little endian per record'''
+    try:
+        ctx.attach_db_session(db_session)
+        tile = service.get_heatmap_tile(
+            ctx, date if date is not None else time_util.datetime_to_ts(time_util.now()), z, x, y)
+    except Exception as e:
+        db_session.rollback()
+        raise e
+    finally:
+        db_session.commit()
+    if tile is None:
+        return Response(status_code=HTTPStatus.NO_CONTENT.value)
+    data, etag = tile
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(env_var.HEATMAP_TILE_CACHE_TTL)}"}
+    if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=HTTPStatus.NOT_MODIFIED.value, headers=headers)
+    return Response(content=data, media_type="application/octet-stream", headers=headers)
+
+
 @prediction_router.post("/prediction/upload/", response_model=BaseResponse)
 async def create_upload_file(file: UploadFile = File(...), db_session: Session = Depends(db.get_db_session)):
     logging.info("api upload file")
@@ -106,3 +148,13 @@ def get_hcmc_summary(db_session: Session = Depends(db.get_db_session), ctx: Cont
         raise e
     finally:
         db_session.commit()
+
+
+@prediction_router.get("/prediction/cache/stats", response_model=BaseResponse)
+def get_cache_stats():
+    return BaseResponse(data={
+        "prediction": prediction_cache.get_stats(),
+        "weather_log": weather_log_cache.get_stats(),
+        "quartile": quartile_cache.get_stats(),
+        "heatmap_tile": heatmap_tile_cache.get_stats(),
+    })
@@ -9,3 +9,5 @@ DOUBLE_QUOTE = "\""
 PLUS = "+"
 LOCATION_DISTANCE_THRESHOLD = 1e-9
 ALLOW_FILE_EXTENSION = [".csv", ".xlsx"]
+MODEL_TIME_WINDOW_ID_HEADER = "X-Model-Time-Window-Id"
+MODEL_VERSION_HEADER = "X-Model-Version"
@@ -22,6 +22,12 @@ class Context(dict):
     def attach_db_session(self, db_session: Session):
         self.update({"db_session": db_session})
 
+    def extract_model_time_window_id(self) -> int:
+        return self.get("model_time_window_id")
+
+    def extract_model_version(self) -> str:
+        return self.get("model_version")
+
 
 def get_context() -> Generator[Context, None, None]:
     ctx = context.get("ctx")
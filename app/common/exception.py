@@ -6,6 +6,22 @@ class ThirdServiceException(Exception):
         return f"third party service encounter problem"
 
 
+class ModelWarmingException(Exception):
+    '''model has no trained artifact yet and is being trained in background'''
+    code = 503
+
+    def __repr__(self) -> str:
+        return f"model is warming up"
+
+
+class ModelNotFoundException(Exception):
+    '''requested time window or model version has no artifact'''
+    code = 404
+
+    def __repr__(self) -> str:
+        return f"model is not found"
+
+
 class MissingFieldException(Exception):
     def __init__(self, *args: object, line: int = None, file_name: str = None) -> None:
         super().__init__(*args)
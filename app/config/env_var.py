@@ -24,6 +24,28 @@ REDIS_HOST: str = os.getenv("REDIS_HOST", default="vove_redis_")+ENV
 REDIS_PORT: str = "6379"
 REDIS_URL: str = f"redis://{REDIS_HOST}:{REDIS_PORT}"
 CACHE_OUTDATED_TIME: int = int(os.getenv('CALCULATION_CONFIG_CACHE_OUTDATED_TIME', default=600))
+# CACHE
+# memory: cache in each api process, redis: cache shared by every api replica
+CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", default="memory")
+CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", default=REDIS_URL)
+CACHE_MEMORY_SIZE: int = int(os.getenv("CACHE_MEMORY_SIZE", default=100000))
+PREDICTION_CACHE_TTL: float = float(os.getenv("PREDICTION_CACHE_TTL", default=3600))
+WEATHER_LOG_CACHE_TTL: float = float(os.getenv("WEATHER_LOG_CACHE_TTL", default=3600))
+# quartile keep moving while predictions of the day arrive, keep it short
+QUARTILE_CACHE_TTL: float = float(os.getenv("QUARTILE_CACHE_TTL", default=60))
+CITY_WARD_RISK_CACHE_TTL: float = float(os.getenv("CITY_WARD_RISK_CACHE_TTL", default=300))
+# coalesce concurrent weather fetch and prediction of other api process through redis lock too
+IS_SINGLE_FLIGHT_ACROSS_PROCESS: bool = True if os.getenv("IS_SINGLE_FLIGHT_ACROSS_PROCESS") else False
+SINGLE_FLIGHT_LOCK_TIMEOUT: float = float(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", default=30))
+# PREDICTION GRID
+# each location with a weather gap cost one third party call, keep one request bounded
+PREDICTION_GRID_MAX_LOCATIONS: int = int(os.getenv("PREDICTION_GRID_MAX_LOCATIONS", default=200))
+PREDICTION_GRID_MAX_DAYS: int = int(os.getenv("PREDICTION_GRID_MAX_DAYS", default=31))
+# HEATMAP TILE
+HEATMAP_TILE_MIN_ZOOM: int = int(os.getenv("HEATMAP_TILE_MIN_ZOOM", default=10))
+HEATMAP_TILE_MAX_ZOOM: int = int(os.getenv("HEATMAP_TILE_MAX_ZOOM", default=15))
+HEATMAP_TILE_CACHE_TTL: float = float(os.getenv("HEATMAP_TILE_CACHE_TTL", default=300))
+HEATMAP_TILE_CACHE_SIZE: int = int(os.getenv("HEATMAP_TILE_CACHE_SIZE", default=4096))
 # CELERY
 # default celery broker and result back end host = redis url
 CELERY_BROKER_URL: str = REDIS_URL
@@ -84,5 +106,17 @@ try:
 except Exception:
     SLACK_MENTION_USERS = SLACK_DEFAULT_MENTION_USERS
 
+# TRAINING
+# max number of time window we train at the same time, on process pool or across celery workers
+TRAIN_MODEL_CONCURRENCY: int = int(os.getenv("TRAIN_MODEL_CONCURRENCY", default=4))
+# stream training data from server side cursor in chunk so memory is bounded, feature is loaded as float32
+IS_STREAMING_TRAIN_DATA: bool = True if os.getenv("IS_STREAMING_TRAIN_DATA") else False
+TRAIN_DATA_CHUNK_SIZE: int = int(os.getenv("TRAIN_DATA_CHUNK_SIZE", default=10000))
+# interval in second api poll latest model version from file service
+MODEL_RELOAD_INTERVAL: float = float(os.getenv("MODEL_RELOAD_INTERVAL", default=300))
+# max bytes of model artifact api keep in memory, least recently used model is evicted when it is exceeded
+MODEL_POOL_MEMORY_BUDGET: int = int(os.getenv("MODEL_POOL_MEMORY_BUDGET", default=256*1024*1024))
+
 # EXPERIMENT
+# allow request to choose which time window and version of model is used by header
 IS_EXPERIMENT: bool = True if os.getenv("IS_EXPERIMENT") else False
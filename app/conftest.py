@@ -141,3 +141,13 @@ def db_session_test():
     yield db_session_test
     # put back the connection to the connection pool
     db_session_test.close()
+
+
+@pytest.fixture()
+def clean_db_session_test(db_session_test: session.Session):
+    '''db_session_test on empty tables, for test which assert on whole table or insert rows with fixed ids'''
+    db_session_test.execute(text(
+        f"TRUNCATE {', '.join(table.name for table in Base.metadata.sorted_tables)} RESTART IDENTITY CASCADE"))
+    db_session_test.commit()
+    yield db_session_test
+    db_session_test.rollback()
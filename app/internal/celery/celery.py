@@ -51,14 +51,28 @@ def make_celery():
 
     celery.autodiscover_tasks(['app.internal.celery.tasks.task_crawl_data'])
     celery.autodiscover_tasks(['app.internal.celery.tasks.task_train_model'])
+    celery.autodiscover_tasks(['app.internal.celery.tasks.task_train_time_windows'])
+    celery.autodiscover_tasks(['app.internal.celery.tasks.task_aggregate_train_report'])
     celery.autodiscover_tasks(['app.internal.celery.tasks.task_sync_data_from_s3'])
+    celery.autodiscover_tasks(['app.internal.celery.tasks.task_rollup_ward_risk'])
+    celery.autodiscover_tasks(['app.internal.celery.tasks.task_render_heatmap_tiles'])
     # For config schedule cronjob
     celery.conf.update(
         beat_schedule={
             'task_crawl_data': {
                 'task': 'task_crawl_data',
                 'schedule': crontab(minute=0, hour='0')
-            }
+            },
+            # after weather of the day is crawled, then every hour as quartile threshold move with new prediction
+            'task_rollup_ward_risk': {
+                'task': 'task_rollup_ward_risk',
+                'schedule': crontab(minute=30)
+            },
+            # after prediction of the day is memoized by the rollup
+            'task_render_heatmap_tiles': {
+                'task': 'task_render_heatmap_tiles',
+                'schedule': crontab(minute=45, hour='0')
+            },
         },
     )
     return celery
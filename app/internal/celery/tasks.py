@@ -1,11 +1,20 @@
+from dataclasses import asdict
+from celery import chord
 from celery.utils.log import get_task_logger
 
 from app.internal.celery.celery import celery_app
 from app.internal.celery.base import BaseTask
 from app.internal.celery.crawl_weather_data.crawl_weather_data import get_data
+from app.config import env_var
 from app.internal.dao.db import get_db_session
-from app.internal.celery.train_model.train import train_models
+from app.internal.celery.train_model.train import (
+    aggregate_train_report, get_time_window_ids, split_time_window_ids, train_time_window)
 from app.internal.celery.sync_data.sync_data import daily_sync_data_from_file_service
+from app.internal.model.model.constants import DEFAULT_TIME_WINDOW_ID
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.service.heatmap_service import render_heatmap_tiles
+from app.internal.service.ward_risk_service import rollup_ward_risk
+from app.internal.util.time_util import time_util
 
 logger = get_task_logger(__name__)
 
@@ -17,12 +26,56 @@ def task_crawl_data():
 
 
 @celery_app.task(name='task_train_model', base=BaseTask)
-def task_train_model():
+def task_train_model(is_force: bool = False, is_incremental: bool = True):
     logger.info('Start trainning all model')
-    train_models()
+    chunks = split_time_window_ids(get_time_window_ids(), env_var.TRAIN_MODEL_CONCURRENCY)
+    if len(chunks) == 0:
+        return
+    # each chunk run on one worker so at most TRAIN_MODEL_CONCURRENCY windows are trained at the same time
+    chord(task_train_time_windows.s(chunk, is_force, is_incremental) for chunk in chunks)(
+        task_aggregate_train_report.s())
+
+
+@celery_app.task(name='task_train_time_windows', base=BaseTask)
+def task_train_time_windows(time_window_ids: list[int], is_force: bool = False,
+                            is_incremental: bool = True) -> list[dict]:
+    logger.info(f'Start trainning model of time window ids {time_window_ids}')
+    return [train_time_window(time_window_id, is_force, is_incremental) for time_window_id in time_window_ids]
+
+
+@celery_app.task(name='task_aggregate_train_report', base=BaseTask)
+def task_aggregate_train_report(chunk_reports: list[list[dict]]) -> dict:
+    report = aggregate_train_report(report for chunk_report in chunk_reports for report in chunk_report)
+    logger.info(f'Train {len(report.time_window_reports)} time windows in {report.wall_time:.2f}s, '
+                f'{report.success_count} success, {report.skipped_count} skipped, {report.failed_count} failed')
+    return asdict(report)
 
 
 @celery_app.task(name="task_sync_data_from_s3", base=BaseTask)
 def task_sync_data():
     logger.info("start sync data from s3")
     daily_sync_data_from_file_service()
+
+
+@celery_app.task(name="task_rollup_ward_risk", base=BaseTask)
+def task_rollup_ward_risk(time: int = None):
+    '''predict every ward of the day and save rate count per district, hcmc summary only read the rollup'''
+    time = time if time is not None else time_util.datetime_to_ts(time_util.now())
+    logger.info(f"start rollup ward risk at {time}")
+    db_session = next(get_db_session())
+    try:
+        rollup_ward_risk(db_session, Nb2MosquittoModel(DEFAULT_TIME_WINDOW_ID), time)
+    finally:
+        db_session.close()
+
+
+@celery_app.task(name="task_render_heatmap_tiles", base=BaseTask)
+def task_render_heatmap_tiles(time: int = None):
+    '''pre render heatmap tiles of the day, tile api only read them'''
+    time = time if time is not None else time_util.datetime_to_ts(time_util.now())
+    logger.info(f"start render heatmap tiles at {time}")
+    db_session = next(get_db_session())
+    try:
+        render_heatmap_tiles(db_session, Nb2MosquittoModel(DEFAULT_TIME_WINDOW_ID), time)
+    finally:
+        db_session.close()
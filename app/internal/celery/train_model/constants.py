@@ -0,0 +1,3 @@
+TRAIN_STATUS_SUCCESS = "SUCCESS"
+TRAIN_STATUS_SKIPPED = "SKIPPED"
+TRAIN_STATUS_FAILED = "FAILED"
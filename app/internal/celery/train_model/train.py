@@ -1,13 +1,113 @@
-from sqlalchemy.orm import Session
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+import logging
+import time
+from typing import Iterable
 
-from app.internal.dao.db import get_db_session
-from app.internal.model.model.model import Nb2MosquittoModel
+from app.config import env_var
+from app.internal.celery.train_model.constants import TRAIN_STATUS_FAILED, TRAIN_STATUS_SKIPPED, TRAIN_STATUS_SUCCESS
+from app.internal.dao.db import engine, get_db_session
 from app.internal.dao.time_window import TimeWindow
+from app.internal.model.model.model import Nb2MosquittoModel
+
+
+@dataclass
+class TimeWindowTrainReport:
+    time_window_id: int
+    status: str
+    started_at: float
+    finished_at: float
+    wall_time: float
+    error: str = None
+    fit_iterations: int = None
+    fit_wall_time: float = None
+    is_warm_start: bool = False
+
 
+@dataclass
+class TrainReport:
+    time_window_reports: list[TimeWindowTrainReport] = field(default_factory=list)
+    wall_time: float = 0
+    '''time from the first window start to the last window finish, not sum of window wall time'''
+    success_count: int = 0
+    skipped_count: int = 0
+    failed_count: int = 0
 
-def train_models():
+
+def get_time_window_ids() -> list[int]:
     db_session = next(get_db_session())
-    time_window_list = db_session.query(TimeWindow).all()
-    for time_window in time_window_list:
-        model = Nb2MosquittoModel(time_window.id)
-        model.train(db_session)
+    return [time_window.id for time_window in db_session.query(TimeWindow.id).order_by(TimeWindow.id).all()]
+
+
+def split_time_window_ids(time_window_ids: list[int], concurrency: int) -> list[list[int]]:
+    '''split into at most concurrency chunks, each chunk is trained one window after another'''
+    concurrency = max(1, min(concurrency, len(time_window_ids)))
+    return [chunk for chunk in (time_window_ids[idx::concurrency] for idx in range(concurrency)) if len(chunk) > 0]
+
+
+def train_time_window(time_window_id: int, is_force: bool = False, is_incremental: bool = True) -> dict:
+    '''
+    train model of one time window on its own db session, return report as dict so celery can serialize it
+    training is skipped if training data is unchanged unless is_force
+    if is_incremental, time window which only has new rows is fitted from its current model params
+    '''
+    started_at = time.time()
+    db_session = next(get_db_session())
+    try:
+        model = Nb2MosquittoModel(time_window_id)
+        result = model.train(db_session, is_force=is_force, is_incremental=is_incremental)
+    except Exception as e:
+        logging.exception(f"train model of time window id {time_window_id} failed")
+        return _get_time_window_report(time_window_id, TRAIN_STATUS_FAILED, started_at, error=repr(e))
+    finally:
+        db_session.close()
+    if result is None:
+        return _get_time_window_report(time_window_id, TRAIN_STATUS_SKIPPED, started_at)
+    return _get_time_window_report(
+        time_window_id, TRAIN_STATUS_SUCCESS, started_at, fit_iterations=model.fit_info.iterations,
+        fit_wall_time=model.fit_info.wall_time, is_warm_start=model.fit_info.is_warm_start)
+
+
+def _get_time_window_report(time_window_id: int, status: str, started_at: float, **kwargs) -> dict:
+    finished_at = time.time()
+    return asdict(TimeWindowTrainReport(
+        time_window_id=time_window_id, status=status, started_at=started_at, finished_at=finished_at,
+        wall_time=finished_at-started_at, **kwargs))
+
+
+def aggregate_train_report(time_window_reports: Iterable[dict]) -> TrainReport:
+    reports = sorted([TimeWindowTrainReport(**report) for report in time_window_reports],
+                     key=lambda report: report.time_window_id)
+    if len(reports) == 0:
+        return TrainReport()
+    return TrainReport(
+        time_window_reports=reports,
+        wall_time=max(report.finished_at for report in reports) - min(report.started_at for report in reports),
+        success_count=len([report for report in reports if report.status == TRAIN_STATUS_SUCCESS]),
+        skipped_count=len([report for report in reports if report.status == TRAIN_STATUS_SKIPPED]),
+        failed_count=len([report for report in reports if report.status == TRAIN_STATUS_FAILED]),
+    )
+
+
+def _init_train_process():
+    # forked process must not reuse connection of parent process pool
+    engine.dispose(close=False)
+
+
+def train_models(max_workers: int = env_var.TRAIN_MODEL_CONCURRENCY, is_force: bool = False,
+                 is_incremental: bool = True) -> TrainReport:
+    '''
+    train every time window on a process pool of this machine
+    should not be called inside prefork celery worker as its process is daemonic and cannot have children,
+    use task_train_model to fan out across workers instead
+    '''
+    time_window_ids = get_time_window_ids()
+    if len(time_window_ids) == 0:
+        return TrainReport()
+    with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(time_window_ids))),
+                             initializer=_init_train_process) as executor:
+        report = aggregate_train_report(executor.map(partial(train_time_window, is_force=is_force, is_incremental=is_incremental), time_window_ids))
+    logging.info(f"train {len(time_window_ids)} time windows in {report.wall_time:.2f}s, "
+                 f"{report.success_count} success, {report.skipped_count} skipped, {report.failed_count} failed")
+    return report
@@ -8,3 +8,5 @@ from app.internal.dao.third_party_location import ThirdPartyLocation
 from app.internal.dao.prediction_quartile import PredictionQuartile
 from app.internal.dao.district import District
 from app.internal.dao.ward import Ward
+from app.internal.dao.ward_risk_daily import WardRiskDaily
+from app.internal.dao.heatmap_tile import HeatmapTile
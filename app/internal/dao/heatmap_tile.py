@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Index, Integer, LargeBinary, String
+
+from app.internal.dao.base import BaseModel
+
+
+class HeatmapTile(BaseModel):
+    '''pre rendered prediction weight of a web mercator tile of a day, filled by celery after prediction'''
+    __tablename__ = "heatmap_tile"
+    __table_args__ = (
+        Index("ix_heatmap_tile_time_z_x_y", "time", "z", "x", "y", unique=True),
+    )
+
+    time: int = Column(Integer, comment="start time of the day")
+    z: int = Column(Integer)
+    x: int = Column(Integer)
+    y: int = Column(Integer)
+    data: bytes = Column(LargeBinary, comment="pixel x uint8, pixel y uint8, weight float32 of each non empty pixel")
+    etag: str = Column(String(64))
@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import Column, FLOAT, Double, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, FLOAT, Double, Index, Integer, String, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped
 
 from app.internal.dao.base import BaseModel
@@ -14,6 +14,10 @@ class PredictedLog(BaseModel):
     In order to reuse it for another type of project i think naming it as predicted var is better
     '''
     __tablename__ = "predicted_log"
+    __table_args__ = (
+        # a prediction is memoized by location, predicted date and model version
+        Index("ix_predicted_log_memo_key", "location_id", "predict_time", "model_version", unique=True),
+    )
 
     # foreignkey
     location_id: int = Column(Integer, ForeignKey("location.id"), index=True)
@@ -21,6 +25,7 @@ class PredictedLog(BaseModel):
     # data column
     value = Column(Double)
     model_file_path: str = Column(String(50))
+    model_version: str = Column(String(50))
 
     predict_time = Column(Integer, index=True)
 
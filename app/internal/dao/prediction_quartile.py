@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, Index, Integer, LargeBinary
 from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy.dialects.postgresql import JSON
 from app.internal.dao.base import BaseModel
@@ -7,9 +7,15 @@ from app.internal.dao.base import BaseModel
 class PredictionQuartile(BaseModel):
 
     __tablename__ = 'prediction_quartile'
+    __table_args__ = (
+        # one quartile per day
+        Index("ix_prediction_quartile_time", "time", unique=True),
+    )
 
     time: int = Column(Integer, comment="start time of quartile date")
 
     quartile_threshold: list[int] = Column(
         MutableList.as_mutable(JSON),
         comment="array of 3 float that devide  threshold")
+
+    sketch: bytes = Column(LargeBinary, comment="kll sketch of every predicted value of the day")
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Index, Integer, String
+
+from app.internal.dao.base import BaseModel
+
+# district code of the row which counts every ward of the city
+CITY_DISTRICT_CODE = "hcmc"
+
+
+class WardRiskDaily(BaseModel):
+    '''
+    number of ward in each rate of a day, per district and for the whole city, filled by celery after prediction
+    one rollup per model version so experiment model never serve its counts to other model
+    '''
+    __tablename__ = "ward_risk_daily"
+    __table_args__ = (
+        Index("ix_ward_risk_daily_time_district_code_model_version", "time", "district_code", "model_version",
+              unique=True),
+    )
+
+    time: int = Column(Integer, comment="start time of the day")
+    district_code: str = Column(String(255), comment="district location code, hcmc for the whole city")
+    model_version: str = Column(String(50))
+
+    safe_count: int = Column(Integer, default=0)
+    normal_count: int = Column(Integer, default=0)
+    low_risk_count: int = Column(Integer, default=0)
+    high_risk_count: int = Column(Integer, default=0)
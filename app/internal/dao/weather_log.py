@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import Column, Integer, ForeignKey, Float, String, UniqueConstraint
+from sqlalchemy import Column, Index, Integer, ForeignKey, Float, String, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped
 
 from app.internal.dao.base import BaseModel
@@ -10,6 +10,10 @@ if TYPE_CHECKING:
 
 class WeatherLog(BaseModel):
     __tablename__ = "weather_log"
+    __table_args__ = (
+        # latest weather of a location is read backward on this index
+        Index("ix_weather_log_location_id_date_time", "location_id", "date_time"),
+    )
 
     # foreignkey
     location_id = Column(Integer, ForeignKey("location.id"), index=True)
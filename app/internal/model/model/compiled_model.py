@@ -0,0 +1,108 @@
+import io
+import re
+from typing import Any
+import numpy as np
+import pandas as pd
+
+from app.internal.model.model.constants import INTERCEPT_COLUMN, RANDOM_FACTOR_COLUMN
+
+_VC_NAME_LEVEL_PATTERN = r"\[(.+)\]$"
+
+
+class CompiledModel:
+    '''
+    coefficient only artifact of a trained mixed glm, it only keep what we need to predict
+    so loading it does not unpickle statsmodels result and its training design matrix
+    '''
+    feature_names: list[str]
+    fe_params: np.ndarray
+    random_effects: np.ndarray
+    '''random effect lookup array, index is location id, location unseen in training has 0 random effect'''
+    vcp_params: np.ndarray = None
+    '''log standard deviation of variance components, not needed to predict but to warm start next training'''
+
+    def __init__(self, feature_names: list[str], fe_params: np.ndarray, random_effects: np.ndarray,
+                 vcp_params: np.ndarray = None) -> None:
+        self.feature_names = list(feature_names)
+        self.fe_params = np.asarray(fe_params, dtype=np.float64)
+        self.random_effects = np.asarray(random_effects, dtype=np.float64)
+        if vcp_params is not None:
+            self.vcp_params = np.asarray(vcp_params, dtype=np.float64)
+
+    @staticmethod
+    def _get_random_effect_location_ids(model: Any) -> tuple[np.ndarray, list[int]]:
+        '''return index in vc params of location id variance component and its location ids'''
+        vc_idx = np.flatnonzero(model.ident == model.vcp_names.index(RANDOM_FACTOR_COLUMN))
+        location_ids = [int(float(re.search(_VC_NAME_LEVEL_PATTERN, model.vc_names[idx]).group(1)))
+                        for idx in vc_idx]
+        return vc_idx, location_ids
+
+    @classmethod
+    def from_result(cls, result: Any) -> "CompiledModel":
+        '''compile from statsmodels BayesMixedGLMResults, random effect is taken from location id variance component'''
+        vc_idx, location_ids = cls._get_random_effect_location_ids(result.model)
+        random_effects = np.zeros(max(location_ids, default=-1) + 1)
+        random_effects[location_ids] = result.vc_mean[vc_idx]
+        return cls(feature_names=result.model.fep_names, fe_params=result.fe_mean, random_effects=random_effects,
+                   vcp_params=result.vcp_mean)
+
+    @property
+    def nbytes(self) -> int:
+        return self.fe_params.nbytes + self.random_effects.nbytes + (
+            self.vcp_params.nbytes if self.vcp_params is not None else 0)
+
+    def can_warm_start(self) -> bool:
+        return self.vcp_params is not None
+
+    def get_start_params(self, model: Any) -> np.ndarray:
+        '''
+        start params in fe, vcp, vc order for statsmodels mixed glm model of the same formula fitted on newer data
+        feature and location unseen by this model start from 0
+        '''
+        fe_params = np.array([self.fe_params[self.feature_names.index(name)] if name in self.feature_names else 0
+                              for name in model.fep_names], dtype=np.float64)
+        vcp_params = self.vcp_params if len(self.vcp_params) == model.k_vcp else np.ones(model.k_vcp)
+        vc_params = np.zeros(model.k_vc)
+        vc_idx, location_ids = self._get_random_effect_location_ids(model)
+        vc_params[vc_idx] = self.get_random_effects(np.array(location_ids, dtype=np.int64))
+        return np.concatenate((fe_params, vcp_params, vc_params))
+
+    def get_design_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        return np.column_stack([
+            np.ones(len(df)) if name == INTERCEPT_COLUMN else df[name].to_numpy(dtype=np.float64)
+            for name in self.feature_names
+        ])
+
+    def get_random_effects(self, location_ids: np.ndarray) -> np.ndarray:
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        random_effects = np.zeros(len(location_ids))
+        is_seen = (location_ids >= 0) & (location_ids < len(self.random_effects))
+        random_effects[is_seen] = self.random_effects[location_ids[is_seen]]
+        return random_effects
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        '''return exp(X beta + u[location id]), df should contain every feature column and location id column'''
+        linear = self.get_design_matrix(df) @ self.fe_params + self.get_random_effects(df[RANDOM_FACTOR_COLUMN])
+        return np.exp(linear)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            feature_names=np.array(self.feature_names),
+            fe_params=self.fe_params,
+            random_effects=self.random_effects,
+            **({"vcp_params": self.vcp_params} if self.vcp_params is not None else {}),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompiledModel":
+        with np.load(io.BytesIO(data), allow_pickle=False) as artifact:
+            return cls(
+                feature_names=artifact["feature_names"].tolist(),
+                fe_params=artifact["fe_params"],
+                random_effects=artifact["random_effects"],
+                # artifact compiled before we keep vcp params cannot be used to warm start
+                vcp_params=artifact["vcp_params"] if "vcp_params" in artifact.files else None,
+            )
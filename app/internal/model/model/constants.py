@@ -11,6 +11,13 @@ NORMAL_COLUMNS = [
 
 RANDOM_FACTOR_COLUMN = "location_id"
 
+DEFAULT_TIME_WINDOW_ID = 1
+
+# model version of prediction made by artifact saved before we version them
+LEGACY_MODEL_VERSION = "legacy"
+
+INTERCEPT_COLUMN = "Intercept"
+
 
 PREDICTED_VAR = "value"
 
@@ -1,4 +1,4 @@
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 import logging
 import numpy as np
 import pandas as pd
@@ -7,6 +7,7 @@ from sqlalchemy import func, asc
 from sqlalchemy.orm import Session
 from abc import ABC, abstractmethod
 
+from app.config import env_var
 from app.common.constant import LOCATION_DISTANCE_THRESHOLD, PLUS, SUCCESS_STATUS_CODE
 from app.common.exception import ThirdServiceException
 from app.internal.dao.db import get_db_session
@@ -15,18 +16,161 @@ from app.internal.dao.weather_log import WeatherLog
 from app.internal.dao.location import Location
 from app.internal.repository.weather_log import weather_log_repo
 from app.internal.model.model.constants import *
+from app.internal.model.model.fingerprint import TrainDataFingerprint
+from app.internal.model.model.scaler import MaxScaler
+from app.internal.model.model.weather_log_cache import weather_log_cache
+from app.internal.util.cache_util.single_flight import new_single_flight
 from app.internal.util.time_util import time_util
 from app.adapter.visual_crossing_adapter import visual_crossing_adapter, GetWeatherRequest
 from app.internal.repository.location import location_repo
 
 
+weather_log_flight = new_single_flight("weather_log")
+
+
+def get_or_fetch_weather_log(db_session: Session, location: Location, date_time: int) -> WeatherLog:
+    '''
+    get weather log of location at the day of date time, missing one is fetched from visual crossing and saved
+    concurrent fetch of the same location and day is done once, caller which waited get a detached copy
+    '''
+    weather_log = _get_day_weather_log(db_session, location, date_time)
+    if weather_log is not None:
+        return weather_log
+    snapshot = weather_log_flight.do(
+        (location.id, time_util.to_start_date_timestamp(date_time)),
+        lambda: _fetch_weather_log(db_session, location, date_time).as_dict())
+    return WeatherLog(**snapshot)
+
+
+def _get_day_weather_log(db_session: Session, location: Location, date_time: int) -> WeatherLog:
+    return db_session.query(WeatherLog).where(
+        WeatherLog.location_id == location.id,
+        WeatherLog.date_time == time_util.to_start_date_timestamp(date_time)).order_by(asc(WeatherLog.id)).first()
+
+
+def _fetch_weather_log(db_session: Session, location: Location, date_time: int) -> WeatherLog:
+    # other process may save it while we wait for the lock
+    weather_log = _get_day_weather_log(db_session, location, date_time)
+    if weather_log is not None:
+        return weather_log
+    # if we cannot get this weather log we will try to call to visual crossing to get weather
+    req = GetWeatherRequest(
+        longitude=location.longitude,
+        latitude=location.latitude,
+        start_date_time=time_util.to_start_date_timestamp(date_time),
+        end_date_time=time_util.to_end_date_timestamp(date_time),
+    )
+    weather_log_resp = visual_crossing_adapter.get_weather_log(req)
+    if weather_log_resp.code != SUCCESS_STATUS_CODE:
+        raise ThirdServiceException()
+    data = weather_log_resp.data[0]
+    # save it without time window id, will have celery job to update it later
+    weather_log = WeatherLog(**data.dict(), location_id=location.id)
+    return weather_log_repo.save(db_session, weather_log)
+
+
+def get_or_fetch_weather_logs(db_session: Session, location: Location, date_times: list[int]) -> dict[int, WeatherLog]:
+    '''
+    get weather log of location at the day of each date time, return start date timestamp map to weather log
+    whole range is read in one query, each contiguous run of missing days is fetched in one visual crossing request
+    and all of them are saved in one transaction, fetched one is returned as a detached copy
+    '''
+    days = sorted(set(time_util.to_start_date_timestamp(date_time) for date_time in date_times))
+    if len(days) == 0:
+        return {}
+    map_day_to_weather_log = _get_range_weather_logs(db_session, location, days)
+    missing_days = [day for day in days if day not in map_day_to_weather_log]
+    if len(missing_days) == 0:
+        return map_day_to_weather_log
+    snapshots = weather_log_flight.do(
+        (location.id, missing_days[0], missing_days[-1]),
+        lambda: _fetch_weather_logs(db_session, location, missing_days))
+    for snapshot in snapshots:
+        map_day_to_weather_log.setdefault(snapshot["date_time"], WeatherLog(**snapshot))
+    if any(day not in map_day_to_weather_log for day in missing_days):
+        raise ThirdServiceException()
+    return map_day_to_weather_log
+
+
+def _get_range_weather_logs(db_session: Session, location: Location, days: list[int]) -> dict[int, WeatherLog]:
+    weather_logs = db_session.query(WeatherLog).where(
+        WeatherLog.location_id == location.id, WeatherLog.date_time >= days[0], WeatherLog.date_time <= days[-1]
+    ).order_by(asc(WeatherLog.id)).all()
+    day_set = set(days)
+    map_day_to_weather_log: dict[int, WeatherLog] = {}
+    for weather_log in weather_logs:
+        if weather_log.date_time in day_set:
+            # keep the first record in case one location has duplicated weather log in a day
+            map_day_to_weather_log.setdefault(weather_log.date_time, weather_log)
+    return map_day_to_weather_log
+
+
+def _split_contiguous_days(days: list[int]) -> list[list[int]]:
+    '''split sorted start date timestamps into runs of consecutive dates'''
+    runs: list[list[int]] = []
+    for day in days:
+        if len(runs) > 0 and (time_util.ts_to_datetime(runs[-1][-1]) + timedelta(1)).date() == \
+                time_util.ts_to_datetime(day).date():
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def _fetch_weather_logs(db_session: Session, location: Location, days: list[int]) -> list[dict]:
+    '''return snapshot of weather log of the days'''
+    # other process may save some of them while we wait for the lock
+    map_day_to_weather_log = _get_range_weather_logs(db_session, location, days)
+    missing_days = [day for day in days if day not in map_day_to_weather_log]
+    new_weather_logs: list[WeatherLog] = []
+    for run in _split_contiguous_days(missing_days):
+        weather_log_resp = visual_crossing_adapter.get_weather_log_in_range(GetWeatherRequest(
+            longitude=location.longitude,
+            latitude=location.latitude,
+            start_date_time=run[0],
+            end_date_time=run[-1],
+        ))
+        if weather_log_resp.code != SUCCESS_STATUS_CODE:
+            raise ThirdServiceException()
+        run_days = set(run)
+        for data in weather_log_resp.data:
+            # save it without time window id, will have celery job to update it later
+            weather_log = WeatherLog(**data.dict(), location_id=location.id)
+            if weather_log.date_time in run_days:
+                run_days.remove(weather_log.date_time)
+                new_weather_logs.append(weather_log)
+    db_session.add_all(new_weather_logs)
+    db_session.commit()
+    # read back in one query so value is typed by db
+    return [weather_log.as_dict() for weather_log in _get_range_weather_logs(db_session, location, days).values()]
+
+
 class DataLoader(ABC):
     @abstractmethod
     def get_train_data(self, *args, **kwargs) -> pd.DataFrame: ...
 
     @abstractmethod
-    def get_history_input_data(self, db_session: Session, location: Location, date_time: int, *args, **
-                               kwargs) -> pd.DataFrame: ...
+    def get_train_data_fingerprint(self, db_session: Session, *args, **kwargs) -> TrainDataFingerprint: ...
+
+    @abstractmethod
+    def get_history_input_data(self, db_session: Session, location: Location, date_time: int, scaler: MaxScaler,
+                               *args, **kwargs) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def get_history_input_data_batch(self, db_session: Session, locations: list[Location], date_time: int,
+                                     scaler: MaxScaler, *args, **kwargs) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def get_history_input_data_grid(self, db_session: Session, locations: list[Location], days: list[int],
+                                    scaler: MaxScaler, *args, **kwargs) -> tuple[list[tuple[int, int]],
+                                                                                 pd.DataFrame]: ...
+
+
+_TRAIN_DATA_DTYPES = {
+    **{col: np.float64 for col in NORMAL_COLUMNS},
+    PREDICTED_VAR: np.int64,
+    RANDOM_FACTOR_COLUMN: np.int64,
+}
 
 
 def get_rename_mapper_for_sqlalchemy_select(table_name: str, column_names: list[str]) -> dict[str, str]:
@@ -35,90 +179,201 @@ def get_rename_mapper_for_sqlalchemy_select(table_name: str, column_names: list[
 
 class WeatherDataLoader(DataLoader):
 
-    def preprocess_weather_log(self, db_session: Session, df: pd.DataFrame) -> pd.DataFrame:
-        """handle preprocess weather log"""
+    def preprocess_weather_log(self, db_session: Session, df: pd.DataFrame, scaler: MaxScaler) -> pd.DataFrame:
+        """handle preprocess weather log, scaler should be fitted on training data"""
 
         df = df.fillna(0)  # TODO: handle missing value by other way
 
         # ensure our id is not convert to float when load data, if remove this could lead to result in empty data frame when merge
         df = df.astype({col: "int" for col in ["time_window_id", "location_id", "date_time"]})
 
-        for col in df.columns:
-            if col not in NORMAL_COLUMNS:
-                continue
-            df[col] = df[col].apply(lambda x: float(x) / float(np.max(df[col]))
-                                    if float(np.max(df[col])) > 0 else 0)  # transform to 0-1 range
-        return df
-
-    def preprocess_predicted_var(self, db_session: Session, df: pd.DataFrame) -> pd.DataFrame:
-        # clean column name geneate by sqlalchemy
-
-        # ensure our id is not convert to float when load data, if remove this could lead to result in empty data frame when merge
-        df = df.astype({col: "int" for col in ["time_window_id", "location_id", "date_time"]})
-        return df
-
-    def load_train_weather_log_from_db(self, db_session: Session, time_window_id: int):
-
-        # load the data from the database into a pandas DataFrame'
+        return scaler.transform(df)  # transform to 0-1 range
 
+    def fit_scaler(self, db_session: Session, time_window_id: int, scaler: MaxScaler = None) -> MaxScaler:
+        '''fit scaler of a time window with max of each column computed in db, it is fitted on every weather log
+        of the time window, including one has no predicted var'''
         df = pd.read_sql_query(
-            db_session.query(WeatherLog).filter(WeatherLog.time_window_id == time_window_id).statement,
+            db_session.query(*[func.max(getattr(WeatherLog, col)).label(col) for col in NORMAL_COLUMNS]).filter(
+                WeatherLog.time_window_id == time_window_id).statement,
             db_session.connection(),
-            coerce_float=False
         )
-        return self.preprocess_weather_log(db_session, df)
+        return (scaler or MaxScaler(NORMAL_COLUMNS)).fit(df.fillna(0))
 
     def get_train_data(self, db_session: Session, *args,  **kwargs) -> pd.DataFrame:
         return self._get_train_data(db_session, *args, **kwargs)
 
-    def load_predicted_var(self, db_session: Session,  time_window_id: int) -> pd.DataFrame:
-        df = pd.read_sql_query(
-            db_session.query(PredictedVar).filter(
-                PredictedVar.time_window_id == time_window_id).statement,
-            db_session.connection(),
-            coerce_float=False
+    def get_train_data_fingerprint(self, db_session: Session, time_window_id: int, *args,
+                                   **kwargs) -> TrainDataFingerprint:
+        '''row count and max updated at of weather log and predicted var we load in get train data'''
+        weather_log_count, weather_log_max_updated_at = db_session.query(
+            func.count(WeatherLog.id), func.max(WeatherLog.updated_at)).filter(
+            WeatherLog.time_window_id == time_window_id).one()
+        predicted_var_count, predicted_var_max_updated_at = db_session.query(
+            func.count(PredictedVar.id), func.max(PredictedVar.updated_at)).filter(
+            PredictedVar.time_window_id == time_window_id).one()
+        return TrainDataFingerprint(
+            weather_log_count=weather_log_count,
+            weather_log_max_updated_at=weather_log_max_updated_at,
+            predicted_var_count=predicted_var_count,
+            predicted_var_max_updated_at=predicted_var_max_updated_at,
         )
-        return self.preprocess_predicted_var(db_session, df)
 
-    def _get_train_data(self, db_session: Session, time_window_id: int, *args,  **kwargs) -> pd.DataFrame:
-        weather_log = self.load_train_weather_log_from_db(db_session, time_window_id)
-        predicted_var = self.load_predicted_var(db_session, time_window_id)
+    def get_train_data_query(self, db_session: Session, time_window_id: int):
+        '''weather log joined with its predicted var in db, only select column we train on, null label is left out'''
+        return db_session.query(
+            *[getattr(WeatherLog, col) for col in NORMAL_COLUMNS],
+            getattr(PredictedVar, PREDICTED_VAR),
+            getattr(WeatherLog, RANDOM_FACTOR_COLUMN),
+        ).join(PredictedVar, (PredictedVar.time_window_id == WeatherLog.time_window_id)
+               & (PredictedVar.location_id == WeatherLog.location_id)
+               & (PredictedVar.date_time == WeatherLog.date_time)
+               ).filter(WeatherLog.time_window_id == time_window_id, PredictedVar.value.isnot(None))
 
-        merged_df = pd.merge(
-            weather_log, predicted_var, on=["time_window_id", "location_id", "date_time"], how="inner",
-        )
+    def stream_train_data(self, db_session: Session, time_window_id: int, scaler: MaxScaler,
+                          chunk_size: int = env_var.TRAIN_DATA_CHUNK_SIZE) -> pd.DataFrame:
+        '''
+        read train data from server side cursor chunk by chunk into preallocated arrays, so we never hold the whole
+        result set as python objects, features are scaled per chunk and kept as float32
+        scaler should be fitted before
+        '''
+        query = self.get_train_data_query(db_session, time_window_id)
+        capacity = max(query.count(), 1)
+        features = np.empty((capacity, len(NORMAL_COLUMNS)), dtype=np.float32)
+        values = np.empty(capacity, dtype=np.int64)
+        location_ids = np.empty(capacity, dtype=np.int32)
 
-        return merged_df[NORMAL_COLUMNS+[PREDICTED_VAR]+[RANDOM_FACTOR_COLUMN]]
+        n_row = 0
+        result = db_session.execute(query.statement.execution_options(stream_results=True, yield_per=chunk_size))
+        for rows in result.partitions():
+            chunk = np.array(rows, dtype=np.float64)  # null is converted to nan
+            if n_row + len(chunk) > capacity:
+                # rows inserted after we count
+                capacity = max(2 * capacity, n_row + len(chunk))
+                features = np.resize(features, (capacity, len(NORMAL_COLUMNS)))
+                values = np.resize(values, capacity)
+                location_ids = np.resize(location_ids, capacity)
+            # TODO: handle missing value by other way
+            chunk_features = np.nan_to_num(chunk[:, :len(NORMAL_COLUMNS)], nan=0)
+            features[n_row:n_row+len(chunk)] = scaler.transform_array(chunk_features)
+            values[n_row:n_row+len(chunk)] = chunk[:, len(NORMAL_COLUMNS)]
+            location_ids[n_row:n_row+len(chunk)] = chunk[:, len(NORMAL_COLUMNS)+1]
+            n_row += len(chunk)
+
+        df = pd.DataFrame(features[:n_row], columns=NORMAL_COLUMNS)
+        df[PREDICTED_VAR] = values[:n_row]
+        df[RANDOM_FACTOR_COLUMN] = pd.Categorical(location_ids[:n_row])
+        return df
+
+    def _get_train_data(self, db_session: Session, time_window_id: int, scaler: MaxScaler, *args,
+                        **kwargs) -> pd.DataFrame:
+        self.fit_scaler(db_session, time_window_id, scaler)
+        if env_var.IS_STREAMING_TRAIN_DATA:
+            return self.stream_train_data(db_session, time_window_id, scaler)
+        df = pd.read_sql_query(
+            self.get_train_data_query(db_session, time_window_id).statement,
+            db_session.connection(),
+            dtype=_TRAIN_DATA_DTYPES,
+        )
+        df[NORMAL_COLUMNS] = df[NORMAL_COLUMNS].fillna(0)  # TODO: handle missing value by other way
+        df[RANDOM_FACTOR_COLUMN] = df[RANDOM_FACTOR_COLUMN].astype("category")
+        return scaler.transform(df)[NORMAL_COLUMNS+[PREDICTED_VAR]+[RANDOM_FACTOR_COLUMN]]
 
     def _get_weather_log(self, db_session: Session, location: Location, date_time: int) -> WeatherLog:
-        query = db_session.query(WeatherLog).where(WeatherLog.location_id == location.id,
-                                                   WeatherLog.date_time == time_util.to_start_date_timestamp(date_time))
-        weather_log = query.first()
-        if weather_log is None:
-            # if we cannot get this weather log we will try to call to visual crossing to get weather
-            req = GetWeatherRequest(
-                longitude=location.longitude,
-                latitude=location.latitude,
-                start_date_time=time_util.to_start_date_timestamp(date_time),
-                end_date_time=time_util.to_end_date_timestamp(date_time),
-            )
-            weather_log_resp = visual_crossing_adapter.get_weather_log(req)
-            if weather_log_resp.code != SUCCESS_STATUS_CODE:
-                raise ThirdServiceException()
-            data = weather_log_resp.data[0]
-            # save it without time window id, will have celery job to update it later
-            weather_log = WeatherLog(**data.dict(), location_id=location.id)
-            weather_log_repo.save(db_session, weather_log)
-        return weather_log
+        return get_or_fetch_weather_log(db_session, location, date_time)
+
+    def _get_weather_logs(self, db_session: Session, locations: list[Location], date_time: int) -> dict[int,
+                                                                                                           WeatherLog]:
+        '''
+        load weather log of all locations at date time, cached one first then the rest in one query, missing one will
+        be fetch from third party, cached weather log is a detached copy
+        '''
+        day = time_util.to_start_date_timestamp(date_time)
+        map_location_id_to_weather_log: dict[int, WeatherLog] = {
+            location_id: WeatherLog(**snapshot) for (location_id, _), snapshot in weather_log_cache.get_many(
+                [(location.id, day) for location in locations]).items()}
+        cached_location_ids = set(map_location_id_to_weather_log.keys())
+        location_ids = [location.id for location in locations if location.id not in cached_location_ids]
+        weather_logs = db_session.query(WeatherLog).where(
+            WeatherLog.location_id.in_(location_ids),
+            WeatherLog.date_time == day
+        ).order_by(asc(WeatherLog.id)).all() if len(location_ids) > 0 else []
+        for weather_log in weather_logs:
+            # keep the first record in case one location has duplicated weather log in a day
+            map_location_id_to_weather_log.setdefault(weather_log.location_id, weather_log)
+
+        for location in locations:
+            if location.id in map_location_id_to_weather_log:
+                continue
+            try:
+                weather_log = self._get_weather_log(db_session, location, date_time)
+            except ThirdServiceException:
+                logging.info(f"third party has no weather data for location id {location.id}")
+                continue
+            map_location_id_to_weather_log.update({location.id: weather_log})
+        weather_log_cache.set_many({(location_id, day): weather_log.as_dict()
+                                    for location_id, weather_log in map_location_id_to_weather_log.items()
+                                    if location_id not in cached_location_ids})
+        return map_location_id_to_weather_log
 
-    def get_history_input_df(self, db_session: Session, weather_log: WeatherLog) -> pd.DataFrame:
+    def get_history_input_df(self, db_session: Session, weather_log: WeatherLog, scaler: MaxScaler) -> pd.DataFrame:
         df = pd.DataFrame(weather_log.as_dict(), index=[0])
-        df = self.preprocess_weather_log(db_session, df)
+        df = self.preprocess_weather_log(db_session, df, scaler)
         return df[NORMAL_COLUMNS+[RANDOM_FACTOR_COLUMN]]
 
-    def get_history_input_data(self, db_session: Session, location: Location, date_time: int, *args, **
-                               kwargs) -> pd.DataFrame:
+    def get_history_input_data(self, db_session: Session, location: Location, date_time: int, scaler: MaxScaler,
+                               *args, **kwargs) -> pd.DataFrame:
         '''return location id and input df for prediction'''
         weather_log = self._get_weather_log(db_session, location, date_time)
 
-        return self.get_history_input_df(db_session, weather_log)
+        return self.get_history_input_df(db_session, weather_log, scaler)
+
+    def get_history_input_data_batch(self, db_session: Session, locations: list[Location], date_time: int,
+                                     scaler: MaxScaler, *args, **kwargs) -> pd.DataFrame:
+        '''return input df for prediction of many locations, one row per location that has weather log'''
+        map_location_id_to_weather_log = self._get_weather_logs(db_session, locations, date_time)
+        return self._get_history_input_df_batch(db_session, list(map_location_id_to_weather_log.values()), scaler)
+
+    def get_history_input_data_grid(self, db_session: Session, locations: list[Location], days: list[int],
+                                    scaler: MaxScaler, *args, **kwargs) -> tuple[list[tuple[int, int]],
+                                                                                 pd.DataFrame]:
+        '''
+        return (location id, start date timestamp) keys and input df for prediction of every location at every day,
+        one row per key, weather of all of them is read in one query, key which has no weather even from third party
+        is left out
+        '''
+        days = sorted(set(days))
+        if len(locations) == 0 or len(days) == 0:
+            return [], self._get_history_input_df_batch(db_session, [], scaler)
+        map_key_to_weather_log: dict[tuple[int, int], WeatherLog] = {}
+        weather_logs = db_session.query(WeatherLog).where(
+            WeatherLog.location_id.in_([location.id for location in locations]),
+            WeatherLog.date_time >= days[0], WeatherLog.date_time <= days[-1]
+        ).order_by(asc(WeatherLog.id)).all()
+        day_set = set(days)
+        for weather_log in weather_logs:
+            if weather_log.date_time in day_set:
+                # keep the first record in case one location has duplicated weather log in a day
+                map_key_to_weather_log.setdefault((weather_log.location_id, weather_log.date_time), weather_log)
+
+        for location in locations:
+            missing_days = [day for day in days if (location.id, day) not in map_key_to_weather_log]
+            if len(missing_days) == 0:
+                continue
+            try:
+                map_day_to_weather_log = get_or_fetch_weather_logs(db_session, location, missing_days)
+            except ThirdServiceException:
+                logging.info(f"third party has no weather data for location id {location.id}")
+                continue
+            map_key_to_weather_log.update({(location.id, day): weather_log
+                                           for day, weather_log in map_day_to_weather_log.items()})
+        keys = sorted(map_key_to_weather_log.keys())
+        return keys, self._get_history_input_df_batch(
+            db_session, [map_key_to_weather_log[key] for key in keys], scaler)
+
+    def _get_history_input_df_batch(self, db_session: Session, weather_logs: list[WeatherLog],
+                                    scaler: MaxScaler) -> pd.DataFrame:
+        if len(weather_logs) == 0:
+            return pd.DataFrame(columns=NORMAL_COLUMNS+[RANDOM_FACTOR_COLUMN])
+        df = pd.DataFrame([weather_log.as_dict() for weather_log in weather_logs])
+        df = self.preprocess_weather_log(db_session, df, scaler)
+        return df[NORMAL_COLUMNS+[RANDOM_FACTOR_COLUMN]].reset_index(drop=True)
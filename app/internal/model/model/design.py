@@ -0,0 +1,24 @@
+'''
+design matrix of mixed glm, same as patsy build from FORMULA and VC_FORMULA
+but random effect design is sparse instead of dense one hot with one column per location
+'''
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.internal.model.model.constants import INTERCEPT_COLUMN, NORMAL_COLUMNS, RANDOM_FACTOR_COLUMN
+
+
+def get_fixed_effect_design(df: pd.DataFrame) -> tuple[np.ndarray, list[str]]:
+    exog = np.column_stack([np.ones(len(df))] + [df[col].to_numpy(dtype=np.float64) for col in NORMAL_COLUMNS])
+    return exog, [INTERCEPT_COLUMN] + NORMAL_COLUMNS
+
+
+def get_random_effect_design(df: pd.DataFrame) -> tuple[sparse.csr_matrix, np.ndarray, list[str], list[str]]:
+    '''return exog vc, ident, vcp names and vc names, location id column should be categorical'''
+    location_ids: pd.Categorical = df[RANDOM_FACTOR_COLUMN].astype("category").cat.remove_unused_categories().array
+    n_row, n_level = len(location_ids), len(location_ids.categories)
+    exog_vc = sparse.csr_matrix(
+        (np.ones(n_row), (np.arange(n_row), location_ids.codes)), shape=(n_row, n_level))
+    vc_names = [f"C({RANDOM_FACTOR_COLUMN})[{level}]" for level in location_ids.categories]
+    return exog_vc, np.zeros(n_level, dtype=np.int64), [RANDOM_FACTOR_COLUMN], vc_names
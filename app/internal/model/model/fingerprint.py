@@ -0,0 +1,28 @@
+from dataclasses import asdict, dataclass
+import json
+
+
+@dataclass
+class TrainDataFingerprint:
+    '''
+    summary of training data of a time window, persisted next to model artifact
+    if it is unchanged there is no new or updated row so retraining would give the same model
+    '''
+    weather_log_count: int
+    weather_log_max_updated_at: int = None
+    predicted_var_count: int = 0
+    predicted_var_max_updated_at: int = None
+
+    def is_appended(self, previous: "TrainDataFingerprint") -> bool:
+        '''new rows are added since previous and no row is deleted'''
+        return (self.weather_log_count >= previous.weather_log_count
+                and self.predicted_var_count >= previous.predicted_var_count
+                and (self.weather_log_count, self.predicted_var_count) != (
+                    previous.weather_log_count, previous.predicted_var_count))
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(asdict(self)).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TrainDataFingerprint":
+        return cls(**json.loads(data))
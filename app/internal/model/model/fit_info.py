@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class FitInfo:
+    '''how the last fit of a model went, used in training report'''
+    iterations: int
+    wall_time: float
+    is_warm_start: bool = False
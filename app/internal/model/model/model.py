@@ -2,32 +2,60 @@ from abc import ABC, abstractmethod
 from datetime import timedelta
 import datetime
 import logging
-from typing import Any
+import time
+from typing import Any, Iterable
 import pandas as pd
 import numpy as np
 import pickle
+import threading
+import uuid
 import statsmodels.api as sm
-import statsmodels.formula.api as smf
 from sqlalchemy.orm import Session
 from sqlalchemy import func, asc, desc
 
 from app.adapter.file_service import file_service_adapter
 from app.common.constant import LOCATION_DISTANCE_THRESHOLD
+from app.common.exception import ModelWarmingException, ThirdServiceException
 from app.internal.dao.db import get_db_session
 from app.internal.dao.location import Location
 from app.internal.dao.predicted_log import PredictedLog
-from app.internal.model.model.constants import FORMULA, PREDICTED_VAR, VC_FORMULA
+from app.internal.model.model.constants import LEGACY_MODEL_VERSION, NORMAL_COLUMNS, PREDICTED_VAR, RANDOM_FACTOR_COLUMN
+from app.internal.model.model.compiled_model import CompiledModel
+from app.internal.model.model.design import get_fixed_effect_design, get_random_effect_design
+from app.internal.model.model.fingerprint import TrainDataFingerprint
+from app.internal.model.model.fit_info import FitInfo
 from app.internal.model.model.metric import MetricsProvider, NormalMetricsProvider
 from app.internal.model.model.output import Output, MosquittoNormalOutput
+from app.internal.model.model.prediction_cache import prediction_cache
+from app.internal.util.cache_util.single_flight import new_single_flight
+from app.internal.model.model.scaler import MaxScaler
 from app.internal.model.model.data_loader import DataLoader, WeatherDataLoader
 from app.internal.repository.location import LocationRepo, location_repo
-from app.internal.repository.predicted_log import PredictedLogFilter, predicted_log_repo
+from app.internal.repository.predicted_log import predicted_log_repo
 from app.internal.util.time_util import time_util
 
 
+prediction_flight = new_single_flight("prediction")
+
+
 class Model(ABC):
 
     file_path: str
+    compiled_file_path: str
+    scaler_file_path: str
+    fingerprint_file_path: str
+    version_file_path: str
+    version: str = None
+    '''version of artifact, None for artifact saved before we version them'''
+    compiled_model: CompiledModel = None
+    scaler: MaxScaler = None
+    fingerprint: TrainDataFingerprint = None
+    fit_info: FitInfo = None
+    _train_lock: threading.Lock
+    _train_thread: threading.Thread = None
+
+    def __init__(self) -> None:
+        self._train_lock = threading.Lock()
 
     @property
     @abstractmethod
@@ -45,30 +73,129 @@ class Model(ABC):
     @abstractmethod
     def predict(self,  *args, **kwargs) -> Output: ...
 
+    @abstractmethod
+    def compile(self, model: Any) -> CompiledModel: ...
+    'function to export coefficient only artifact from trained model'
+
+    @abstractmethod
+    def fit_scaler(self) -> MaxScaler: ...
+    'function to fit input scaler for model trained before we persist scaler'
+
+    @abstractmethod
+    def set_version(self, version: str): ...
+    'function to point artifact file paths to a version'
+
+    def get_latest_version(self) -> str:
+        return self.read_version(self.version_file_path)
+
+    @staticmethod
+    def read_version(version_file_path: str) -> str:
+        '''version file is uploaded after every artifact of the version so it always point to a complete version'''
+        data = file_service_adapter.file_service.get_file_content(version_file_path)
+        return data.decode() if len(data) > 0 else None
+
+    def get_memory_size(self) -> int:
+        '''bytes of loaded artifact'''
+        size = 0
+        if self.compiled_model is not None:
+            size += self.compiled_model.nbytes
+        if self.scaler is not None and self.scaler.is_fitted():
+            size += self.scaler.max_values.nbytes
+        return size
+
+    def load_scaler(self):
+        if self.scaler is not None:
+            return
+        data = file_service_adapter.file_service.get_file_content(self.scaler_file_path)
+        if len(data) > 0:
+            self.scaler = MaxScaler.from_bytes(data)
+            return
+        # model trained before we persist scaler, its training data is scaled by max of the same time window
+        self.scaler = self.fit_scaler()
+        file_service_adapter.file_service.upload_file(self.scaler.to_bytes(), self.scaler_file_path)
+
+    def load_fingerprint(self) -> TrainDataFingerprint:
+        '''return None for model trained before we persist fingerprint'''
+        if self.fingerprint is None:
+            data = file_service_adapter.file_service.get_file_content(self.fingerprint_file_path)
+            if len(data) > 0:
+                self.fingerprint = TrainDataFingerprint.from_bytes(data)
+        return self.fingerprint
+
+    def load_compiled_model(self):
+        if self.compiled_model is not None:
+            return
+        logging.info(f"compiled model file path {self.compiled_file_path}")
+        data = file_service_adapter.file_service.get_file_content(self.compiled_file_path)
+        if len(data) == 0:
+            return
+        self.compiled_model = CompiledModel.from_bytes(data)
+        logging.info("load compiled model success")
+
     def load_model(self):
-        if self.model is not None:
+        self.load_compiled_model()
+        if self.compiled_model is not None:
+            self.load_scaler()
             return
         logging.info(f"model file path {self.file_path}")
-        # try to load model
-        try:
-            logging.info(self.file_path)
-            data = file_service_adapter.file_service.get_file_content(self.file_path)
-            self.model = pickle.loads(data)
-            logging.info("load model success")
-        except EOFError:
+        data = file_service_adapter.file_service.get_file_content(self.file_path)
+        if len(data) == 0:
             return
-
-    def get_model(self):
-        self.load_model()
+        logging.info("load model success")
+        # model trained before we have compiled artifact, export it so next load is cheap
+        # statsmodels result is not kept in memory as it hold the whole training data
+        self.compiled_model = self.compile(pickle.loads(data))
+        file_service_adapter.file_service.upload_file(self.compiled_model.to_bytes(), self.compiled_file_path)
+        self.load_scaler()
+
+    def is_training(self) -> bool:
+        return self._train_thread is not None and self._train_thread.is_alive()
+
+    def get_model(self) -> CompiledModel:
+        '''
+        return last known good model, it is kept even when retraining run or fail
+        if there is no model yet, training is started in background and ModelWarmingException is raised
+        instead of blocking caller until fit finish
+        '''
+        if self.compiled_model is None and not self.is_training():
+            self.load_model()
         # if try to load model still result in None
-        if self.model is None:
-            logging.info("model is None start train model")
-            self.train()
-        return self.model
-
-    def save(self, model: Any):
-        self.model = model
-        file_service_adapter.file_service.upload_file(pickle.dumps(self.model), self.file_path)
+        if self.compiled_model is None:
+            logging.info("model is None start train model in background")
+            self.train_in_background()
+            raise ModelWarmingException()
+        return self.compiled_model
+
+    def train_in_background(self) -> threading.Thread:
+        '''start training once, concurrent callers while it is running share the same training'''
+        with self._train_lock:
+            if not self.is_training():
+                self._train_thread = threading.Thread(target=self._train_in_background, daemon=True)
+                self._train_thread.start()
+            return self._train_thread
+
+    def _train_in_background(self):
+        db_session = next(get_db_session())
+        try:
+            self.train(db_session)
+        except Exception:
+            logging.exception("train model in background failed, it will be retried by next caller")
+        finally:
+            db_session.close()
+
+    def save(self, model: Any, scaler: MaxScaler, fingerprint: TrainDataFingerprint):
+        '''save as a new version, model already loaded elsewhere keep their version until reloaded'''
+        self.set_version(f"{time_util.datetime_to_file_name_str(time_util.now())}_{uuid.uuid4().hex[:8]}")
+        # scaler is set before compiled model as caller check compiled model to know if model is ready
+        self.scaler = scaler
+        self.compiled_model = self.compile(model)
+        self.fingerprint = fingerprint
+        file_service_adapter.file_service.upload_file(pickle.dumps(model), self.file_path)
+        file_service_adapter.file_service.upload_file(self.compiled_model.to_bytes(), self.compiled_file_path)
+        file_service_adapter.file_service.upload_file(self.scaler.to_bytes(), self.scaler_file_path)
+        file_service_adapter.file_service.upload_file(self.fingerprint.to_bytes(), self.fingerprint_file_path)
+        # version is published last so a partial upload is never loaded
+        file_service_adapter.file_service.upload_file(self.version.encode(), self.version_file_path)
 
 
 class Nb2MosquittoModel(Model):
@@ -76,57 +203,96 @@ class Nb2MosquittoModel(Model):
     metrics_provider = NormalMetricsProvider()
     time_window_id: int
     file_path: str
-    model: sm.BinomialBayesMixedGLM = None
 
-    def __init__(self, time_window_id: int) -> None:
+    def __init__(self, time_window_id: int, version: str = None) -> None:
+        '''load given version of artifact, latest version if version is None'''
         super().__init__()
         self.time_window_id = time_window_id
-        self.file_path = f"model/{time_window_id}.pkl"
+        self.version_file_path = self.get_version_file_path(time_window_id)
+        self.set_version(version if version is not None else self.get_latest_version())
         self.load_model()
 
-    def get_model(self) -> sm.MixedLM:
+    @staticmethod
+    def get_version_file_path(time_window_id: int) -> str:
+        return f"model/{time_window_id}_version"
+
+    def set_version(self, version: str):
+        self.version = version
+        # artifact saved before we version them is at model/{time_window_id}.*
+        prefix = f"model/{self.time_window_id}" if version is None else f"model/{self.time_window_id}/{version}"
+        self.file_path = f"{prefix}.pkl"
+        self.compiled_file_path = f"{prefix}.npz"
+        self.scaler_file_path = f"{prefix}_scaler.npz"
+        self.fingerprint_file_path = f"{prefix}_fingerprint.json"
+
+    def get_model(self) -> CompiledModel:
         return super().get_model()
 
+    def compile(self, model: Any) -> CompiledModel:
+        return CompiledModel.from_result(model)
+
+    def fit_scaler(self) -> MaxScaler:
+        return self.data_loader.fit_scaler(next(get_db_session()), self.time_window_id)
+
     def get_alpha_constants(self, df: pd.DataFrame) -> float:
         # TODO: refactor this function, cannot typehint for model and result so we just accept it colorless
         # some string constant below is math symbol and just has meaning in this specific function so i dont think we should declare constant for them
         poisson = sm.GLM(
             df[PREDICTED_VAR],
-            df[[col for col in df.columns if str(col) != PREDICTED_VAR]],
+            # categorical location id is used as number as it was before we store it as categorical
+            df[[col for col in df.columns if str(col) != PREDICTED_VAR]].astype({RANDOM_FACTOR_COLUMN: np.float64}),
             family=sm.families.Poisson()).fit()
 
-        train_df = df.copy()
-        train_df["LAMBDA"] = poisson.mu
-        train_df['AUX_OLS_DEP'] = train_df.apply(lambda x: ((x[PREDICTED_VAR] - x['LAMBDA'])
-                                                            ** 2 - x['LAMBDA']) / x['LAMBDA'], axis=1)
-
-        # use patsy to form the model specification for the OLSR
-        ols_expr = """AUX_OLS_DEP ~ LAMBDA - 1"""
-
-        # Configure and fit the OLSR model
-        aux_olsr_results = smf.ols(ols_expr, train_df).fit()
-        return aux_olsr_results.params[0]
+        y = df[PREDICTED_VAR].to_numpy(dtype=np.float64)
+        lam = np.asarray(poisson.mu, dtype=np.float64)
+        aux_ols_dep = ((y - lam) ** 2 - lam) / lam
 
-    def train(self, db_session: Session = None, is_force=False) -> Any:
+        # auxiliary OLS AUX_OLS_DEP ~ LAMBDA - 1 has closed form solution since it has no intercept
+        return float(np.dot(lam, aux_ols_dep) / np.dot(lam, lam))
 
-        if not is_force and self.model is not None:
-            # if not force to retrain, we return current model if has
-            return self.model
+    def train(self, db_session: Session = None, is_force=False, is_incremental=False) -> Any:
+        '''
+        return None if training is skipped as training data is unchanged since current model is trained
+        if is_incremental and rows are only appended since current model is trained, fit start from current model params
+        '''
 
         if db_session is None:
             db_session = next(get_db_session())
-        df = self.data_loader.get_train_data(db_session, self.time_window_id)
+        fingerprint = self.data_loader.get_train_data_fingerprint(db_session, self.time_window_id)
+        previous_fingerprint = self.load_fingerprint()
+        if not is_force and self.compiled_model is not None and fingerprint == previous_fingerprint:
+            logging.info(f"training data of time window id {self.time_window_id} is unchanged, skip training")
+            return None
+        is_warm_start = (is_incremental and self.compiled_model is not None and self.compiled_model.can_warm_start()
+                         and previous_fingerprint is not None and fingerprint.is_appended(previous_fingerprint))
+
+        scaler = MaxScaler(NORMAL_COLUMNS)
+        df = self.data_loader.get_train_data(db_session, self.time_window_id, scaler)
 
         alpha = self.get_alpha_constants(df)
 
-        model = sm.PoissonBayesMixedGLM.from_formula(
-            formula=FORMULA, data=df, vc_formulas=VC_FORMULA,
-            vcp_p=alpha,
+        exog, fep_names = get_fixed_effect_design(df)
+        exog_vc, ident, vcp_names, vc_names = get_random_effect_design(df)
+        # same model as from_formula(FORMULA, VC_FORMULA) but patsy would build dense one hot of location id
+        model = sm.PoissonBayesMixedGLM(
+            endog=df[PREDICTED_VAR].to_numpy(dtype=np.float64), exog=exog, exog_vc=exog_vc, ident=ident,
+            vcp_p=alpha, fep_names=fep_names, vcp_names=vcp_names, vc_names=vc_names,
         )
         model.family = sm.families.NegativeBinomial(alpha=alpha)
+        if is_warm_start:
+            start_params = self.compiled_model.get_start_params(model)
+            # fit map has no start params argument, it always start from _get_start (which take rng from 0.14)
+            model._get_start = lambda *args: start_params.copy()
 
+        started_at = time.time()
         result = model.fit_map()
-        self.save(result)
+        if is_warm_start:
+            # remove the override so result is picklable
+            del model._get_start
+        self.fit_info = FitInfo(
+            iterations=int(result.optim_retvals.nit), wall_time=time.time()-started_at, is_warm_start=is_warm_start)
+        logging.info(f"fit model of time window id {self.time_window_id}: {self.fit_info}")
+        self.save(result, scaler, fingerprint)
         return result
 
     def _get_nearest_location(self, db_session: Session, longitude: float, latitude: float) -> Location:
@@ -168,50 +334,151 @@ class Nb2MosquittoModel(Model):
 
     def get_predict_with_location_model(
             self, location: Location, date_time: int, db_session: Session) -> MosquittoNormalOutput:
-        history_predict = predicted_log_repo.first(
-            db_session,
-            filter=PredictedLogFilter(
-                location_id=location.id,
-                created_at_lt=time_util.datetime_to_ts(time_util.now()),
-                created_at_gt=time_util.to_start_date(time_util.now()).timestamp(),
-            )
-        )
-        logging.info(
-            f"history prediction for location id {location.id} at {date_time} is {history_predict.value if history_predict is not None else 'None'}")
-        if history_predict is not None:
-            return MosquittoNormalOutput(
-                count=history_predict.value
-            )
-        inp = self.data_loader.get_history_input_data(db_session, location, date_time)
+        # concurrent request of the same location and day wait for one prediction instead of predicting twice
+        resp = prediction_flight.do(
+            (location.id, time_util.to_start_date_timestamp(date_time), self.get_memo_version()),
+            lambda: self.predict_batch(location_ids=[location.id], date_time=date_time, db_session=db_session))
+        if location.id not in resp:
+            # there is no weather data of this location even from third party
+            raise ThirdServiceException()
+        return resp[location.id]
+
+    def get_memo_version(self) -> str:
+        return self.version if self.version is not None else LEGACY_MODEL_VERSION
+
+    def predict_batch(
+            self, location_ids: Iterable[int], date_time: int, db_session: Session) -> dict[int, MosquittoNormalOutput]:
+        '''
+        predict many locations at once, return location id map to prediction
+        location which has no weather data even from third party is left out of result
+        '''
+        location_ids = list(set(location_ids))
+        if len(location_ids) == 0:
+            return {}
+        # get model before version so version is of the model we predict with
         model = self.get_model()
-        count = model.predict(inp)
-
-        predicted_log_repo.save(
-            db_session,
+        model_version = self.get_memo_version()
+        predict_time = time_util.to_start_date_timestamp(date_time)
+        resp: dict[int, MosquittoNormalOutput] = {}
+        cached_predicts = prediction_cache.get_many(
+            [(location_id, predict_time, model_version) for location_id in location_ids])
+        for (location_id, _, _), count in cached_predicts.items():
+            resp.update({location_id: MosquittoNormalOutput(count=count)})
+
+        history_predicts = predicted_log_repo.get_by_memo_keys(
+            db_session, [(location_id, predict_time, model_version) for location_id in location_ids
+                         if location_id not in resp])
+        for history_predict in history_predicts:
+            resp.update({history_predict.location_id: MosquittoNormalOutput(count=history_predict.value)})
+        prediction_cache.set_many({(history_predict.location_id, predict_time, model_version): history_predict.value
+                                   for history_predict in history_predicts})
+        logging.info(f"history prediction for {len(resp)} of {len(location_ids)} location ids at {date_time}, "
+                     f"{len(cached_predicts)} from cache")
+
+        locations = db_session.query(Location).where(Location.id.in_(
+            [location_id for location_id in location_ids if location_id not in resp])).all()
+        if len(locations) == 0:
+            return resp
+        inp = self.data_loader.get_history_input_data_batch(db_session, locations, date_time, self.scaler)
+        if len(inp) == 0:
+            return resp
+        counts = model.predict(inp)
+
+        predicted_logs = [
             PredictedLog(
-                location_id=location.id,
-                value=count[0],
+                location_id=int(location_id),
+                value=float(count),
                 model_file_path=self.file_path,
-                predict_time=time_util.to_start_date_timestamp(date_time),
-            )
-        )
-        logging.info(
-            f"new prediction for location id {location.id} at {date_time} is {count}")
-        return MosquittoNormalOutput(
-            count=count
-        )
+                model_version=model_version,
+                predict_time=predict_time,
+            ) for location_id, count in zip(inp[RANDOM_FACTOR_COLUMN], counts)
+        ]
+        # concurrent request may predict the same key, its row is kept as both come from the same model and input
+        predicted_log_repo.insert_ignore_conflict(db_session, predicted_logs)
+        prediction_cache.set_many({(predicted_log.location_id, predict_time, model_version): predicted_log.value
+                                   for predicted_log in predicted_logs})
+        for predicted_log in predicted_logs:
+            resp.update({predicted_log.location_id: MosquittoNormalOutput(count=predicted_log.value)})
+        logging.info(f"new prediction for {len(predicted_logs)} location ids at {date_time}")
+        return resp
 
     def predict_for_time_interval(
             self, location_id: int, start_time: int, end_time: int, db_session: Session) -> list[float]:
-
+        return [prediction.count for prediction in self.predict_interval(
+            location_id=location_id, start_time=start_time, end_time=end_time, db_session=db_session).values()]
+
+    def predict_interval(
+            self, location_id: int, start_time: int, end_time: int,
+            db_session: Session) -> dict[int, MosquittoNormalOutput]:
+        '''predict one location at every day from start time, end time excluded, return date time map to prediction'''
+        predictions = self.predict_grid(
+            location_ids=[location_id], start_time=start_time, end_time=end_time, db_session=db_session)
+        return {date_time: prediction for (_, date_time), prediction in predictions.items()}
+
+    @staticmethod
+    def get_interval_date_times(start_time: int, end_time: int) -> list[int]:
+        '''date time of every day from start time, end time excluded'''
         start_time_dt = time_util.ts_to_datetime(start_time)
-        time_interval = time_util.ts_to_datetime(end_time) - time_util.ts_to_datetime(start_time)
-        res: list[float] = []
-        for i in range(time_interval.days):
-            res.append(
-                self.predict_with_location_id(
-                    location_id=location_id, date_time=time_util.datetime_to_ts(
-                        start_time_dt + datetime.timedelta(days=i)),
-                    db_session=db_session).count)
-
-        return res
+        time_interval = time_util.ts_to_datetime(end_time) - start_time_dt
+        return [time_util.datetime_to_ts(start_time_dt + datetime.timedelta(days=i))
+                for i in range(time_interval.days)]
+
+    def predict_grid(
+            self, location_ids: Iterable[int], start_time: int, end_time: int,
+            db_session: Session) -> dict[tuple[int, int], MosquittoNormalOutput]:
+        '''
+        predict every location at every day from start time, end time excluded, return (location id, date time) map
+        to prediction, location and day which has no weather data even from third party is left out
+        memoized predictions of the grid are read in one query, weather of missing cells in one query, missing cells
+        are predicted in one model call and saved in one insert
+        '''
+        location_ids = list(dict.fromkeys(location_ids))
+        date_times = self.get_interval_date_times(start_time, end_time)
+        if len(location_ids) == 0 or len(date_times) == 0:
+            return {}
+        # get model before version so version is of the model we predict with
+        model = self.get_model()
+        model_version = self.get_memo_version()
+        map_date_time_to_day = {date_time: time_util.to_start_date_timestamp(date_time) for date_time in date_times}
+        days = sorted(set(map_date_time_to_day.values()))
+        keys = [(location_id, day) for location_id in location_ids for day in days]
+
+        map_key_to_count = {(location_id, day): count for (location_id, day, _), count in prediction_cache.get_many(
+            [(location_id, day, model_version) for location_id, day in keys]).items()}
+        history_predicts = predicted_log_repo.get_by_memo_keys(
+            db_session, [(location_id, day, model_version) for location_id, day in keys
+                         if (location_id, day) not in map_key_to_count])
+        map_key_to_count.update({(history_predict.location_id, history_predict.predict_time): history_predict.value
+                                 for history_predict in history_predicts})
+        prediction_cache.set_many({(history_predict.location_id, history_predict.predict_time, model_version):
+                                   history_predict.value for history_predict in history_predicts})
+
+        missing_keys = [key for key in keys if key not in map_key_to_count]
+        if len(missing_keys) > 0:
+            missing_location_ids = set(location_id for location_id, _ in missing_keys)
+            locations = db_session.query(Location).where(Location.id.in_(missing_location_ids)).all()
+            inp_keys, inp = self.data_loader.get_history_input_data_grid(
+                db_session, locations, [day for _, day in missing_keys], self.scaler)
+            missing_key_set = set(missing_keys)
+            # a day which is missing for one location only is loaded for every location, keep the missing one only
+            inp_idxs = [idx for idx, key in enumerate(inp_keys) if key in missing_key_set]
+            counts = model.predict(inp.iloc[inp_idxs]) if len(inp_idxs) > 0 else []
+            predicted_logs = [
+                PredictedLog(
+                    location_id=inp_keys[idx][0],
+                    value=float(count),
+                    model_file_path=self.file_path,
+                    model_version=model_version,
+                    predict_time=inp_keys[idx][1],
+                ) for idx, count in zip(inp_idxs, counts)
+            ]
+            predicted_log_repo.insert_ignore_conflict(db_session, predicted_logs)
+            prediction_cache.set_many({(predicted_log.location_id, predicted_log.predict_time, model_version):
+                                       predicted_log.value for predicted_log in predicted_logs})
+            map_key_to_count.update({(predicted_log.location_id, predicted_log.predict_time): predicted_log.value
+                                     for predicted_log in predicted_logs})
+        logging.info(f"predict {len(location_ids)} locations at {len(days)} days, {len(missing_keys)} new")
+
+        return {(location_id, date_time): MosquittoNormalOutput(count=map_key_to_count[(location_id, day)])
+                for location_id in location_ids for date_time, day in map_date_time_to_day.items()
+                if (location_id, day) in map_key_to_count}
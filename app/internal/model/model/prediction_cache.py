@@ -0,0 +1,5 @@
+from app.config import env_var
+from app.internal.util.cache_util.cache_backend import KeyedCache, cache_backend
+
+# (location id, predict time, model version) map to predicted count, in front of predicted log memo table
+prediction_cache = KeyedCache(cache_backend, "prediction", ttl=env_var.PREDICTION_CACHE_TTL)
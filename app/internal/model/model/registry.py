@@ -0,0 +1,132 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+from app.common.exception import ModelNotFoundException
+from app.config import env_var
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.model.model.prediction_cache import prediction_cache
+
+
+class ModelRegistry:
+    '''
+    pool of loaded models keyed by time window id and artifact version, model is loaded lazily on first request
+    and least recently used one is evicted when total size is over memory budget, model without artifact is never
+    pooled, so a bogus version cannot grow the pool
+    latest version of each requested time window is polled, new version is loaded in background then swapped in
+    one assignment, request which already got the old model finish its prediction with the old one
+    '''
+    _models: OrderedDict[tuple[int, str], Nb2MosquittoModel]
+    _warming_models: dict[int, Nb2MosquittoModel]
+    '''latest model of time window which has no artifact yet, one per time window so its training is shared'''
+    _latest_versions: dict[int, str]
+    _memory_budget: int
+    _lock: threading.Lock
+    _poll_thread: threading.Thread = None
+
+    def __init__(self, memory_budget: int = env_var.MODEL_POOL_MEMORY_BUDGET) -> None:
+        self._models = OrderedDict()
+        self._warming_models = {}
+        self._latest_versions = {}
+        self._memory_budget = memory_budget
+        self._lock = threading.Lock()
+
+    def get(self, time_window_id: int, version: str = None) -> Nb2MosquittoModel:
+        '''
+        get model of a version, latest version if version is None
+        raise ModelNotFoundException if the version has no artifact, it is never trained as it is explicitly requested
+        latest model of a time window which has no artifact yet is returned unpooled so caller start its training
+        '''
+        if version is None and time_window_id in self._latest_versions:
+            version = self._latest_versions[time_window_id]
+        model = self._get_loaded(time_window_id, version)
+        if model is not None:
+            return model
+        if version is not None:
+            # load outside lock so other requests are not blocked, concurrent load of the same key is harmless
+            model = Nb2MosquittoModel(time_window_id, version)
+            if model.compiled_model is None:
+                raise ModelNotFoundException()
+            return self._add(model)
+
+        with self._lock:
+            model = self._warming_models.get(time_window_id)
+        if model is None:
+            model = Nb2MosquittoModel(time_window_id)
+        with self._lock:
+            if model.compiled_model is None:
+                return self._warming_models.setdefault(time_window_id, model)
+            # trained in background or loaded, from now on it is served from pool
+            self._warming_models.pop(time_window_id, None)
+            self._latest_versions.setdefault(time_window_id, model.version)
+        return self._add(model)
+
+    def _add(self, model: Nb2MosquittoModel) -> Nb2MosquittoModel:
+        key = (model.time_window_id, model.version)
+        with self._lock:
+            model = self._models.setdefault(key, model)
+            self._models.move_to_end(key)
+            self._evict(keep=key)
+        return model
+
+    def _get_loaded(self, time_window_id: int, version: str) -> Nb2MosquittoModel:
+        with self._lock:
+            model = self._models.get((time_window_id, version))
+            if model is not None:
+                self._models.move_to_end((time_window_id, version))
+            return model
+
+    def get_memory_size(self) -> int:
+        return sum(model.get_memory_size() for model in list(self._models.values()))
+
+    def _evict(self, keep: tuple[int, str]):
+        '''should be called with lock held'''
+        size = self.get_memory_size()
+        for key in list(self._models.keys()):
+            if size <= self._memory_budget:
+                break
+            if key == keep:
+                continue
+            size -= self._models.pop(key).get_memory_size()
+            logging.info(f"evict model of time window id {key[0]} version {key[1]}")
+
+    def reload(self, time_window_id: int) -> bool:
+        '''load latest version of a time window if it is changed, return True if latest version is swapped'''
+        latest_version = Nb2MosquittoModel.read_version(Nb2MosquittoModel.get_version_file_path(time_window_id))
+        if latest_version is None or latest_version == self._latest_versions.get(time_window_id):
+            return False
+        try:
+            self.get(time_window_id, latest_version)
+        except ModelNotFoundException:
+            logging.info(f"cannot load version {latest_version} of time window id {time_window_id}, keep current one")
+            return False
+        logging.info(f"time window id {time_window_id} model is swapped from version "
+                     f"{self._latest_versions.get(time_window_id)} to {latest_version}")
+        self._latest_versions[time_window_id] = latest_version
+        # prediction of old version should not be served anymore
+        prediction_cache.clear()
+        return True
+
+    def reload_all(self):
+        for time_window_id in list(self._latest_versions.keys()):
+            try:
+                self.reload(time_window_id)
+            except Exception:
+                logging.exception(f"reload model of time window id {time_window_id} failed")
+
+    def start_polling(self, interval: float = env_var.MODEL_RELOAD_INTERVAL):
+        '''poll latest version of requested time windows in a daemon thread'''
+        with self._lock:
+            if self._poll_thread is not None:
+                return
+            self._poll_thread = threading.Thread(target=self._poll, args=(interval,), daemon=True)
+            self._poll_thread.start()
+
+    def _poll(self, interval: float):
+        while True:
+            time.sleep(interval)
+            self.reload_all()
+
+
+model_registry = ModelRegistry()
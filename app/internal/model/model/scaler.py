@@ -0,0 +1,44 @@
+import io
+import numpy as np
+import pandas as pd
+
+
+class MaxScaler:
+    '''
+    scale each column to 0-1 range by the max value of that column in training data
+    fitted once when training and persisted next to model artifact, so prediction input is scaled the same way
+    '''
+    columns: list[str]
+    max_values: np.ndarray = None
+
+    def __init__(self, columns: list[str], max_values: np.ndarray = None) -> None:
+        self.columns = list(columns)
+        if max_values is not None:
+            self.max_values = np.asarray(max_values, dtype=np.float64)
+
+    def is_fitted(self) -> bool:
+        return self.max_values is not None
+
+    def fit(self, df: pd.DataFrame) -> "MaxScaler":
+        self.max_values = df[self.columns].to_numpy(dtype=np.float64).max(axis=0, initial=0)
+        return self
+
+    def transform_array(self, values: np.ndarray) -> np.ndarray:
+        '''values columns are in the same order as columns, column with non positive max is transform to 0'''
+        return np.divide(values, self.max_values.astype(values.dtype), out=np.zeros_like(values),
+                         where=self.max_values > 0)
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        df[self.columns] = self.transform_array(df[self.columns].to_numpy(dtype=np.float64))
+        return df
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(buffer, columns=np.array(self.columns), max_values=self.max_values)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MaxScaler":
+        with np.load(io.BytesIO(data), allow_pickle=False) as artifact:
+            return cls(columns=artifact["columns"].tolist(), max_values=artifact["max_values"])
@@ -0,0 +1,5 @@
+from app.config import env_var
+from app.internal.util.cache_util.cache_backend import KeyedCache, cache_backend
+
+# (location id, start date timestamp) map to weather log snapshot from WeatherLog.as_dict
+weather_log_cache = KeyedCache(cache_backend, "weather_log", ttl=env_var.WEATHER_LOG_CACHE_TTL)
@@ -0,0 +1,21 @@
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.internal.dao.heatmap_tile import HeatmapTile
+from app.internal.repository.base import BaseRepo
+
+
+class HeatmapTileRepo(BaseRepo[HeatmapTile]):
+
+    def get_tile(self, db_session: Session, time: int, z: int, x: int, y: int) -> HeatmapTile:
+        return db_session.query(HeatmapTile).where(
+            HeatmapTile.time == time, HeatmapTile.z == z, HeatmapTile.x == x, HeatmapTile.y == y).first()
+
+    def replace_day(self, db_session: Session, time: int, tiles: list[HeatmapTile]):
+        '''replace every tile of a day in one transaction, so reader never see half rendered day'''
+        db_session.execute(delete(HeatmapTile).where(HeatmapTile.time == time))
+        db_session.add_all(tiles)
+        db_session.commit()
+
+
+heatmap_tile_repo = HeatmapTileRepo(HeatmapTile)
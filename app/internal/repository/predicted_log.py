@@ -2,14 +2,19 @@ from app.internal.dao.base import Page
 from app.internal.dao.time_window import TimeWindow
 from app.internal.dao.predicted_log import PredictedLog
 from app.internal.repository.base import BaseRepo, BaseFilterType
+from app.internal.repository.prediction_quartile import prediction_quartile_repo
 
 from sqlalchemy.orm import Session, Query
+from sqlalchemy.dialects.postgresql import insert
 from pydantic import BaseModel
-from sqlalchemy import func, asc, desc
+from sqlalchemy import func, asc, desc, tuple_
+
+MEMO_KEY_COLUMNS = ["location_id", "predict_time", "model_version"]
 
 
 class PredictedLogFilter(BaseFilterType):
     location_id: int = None
+    location_ids: list[int] = None
     created_at_lt: int = None
     created_at_gt: int = None
     time_window_id: int = None
@@ -23,6 +28,8 @@ class PredictedLogRepo(BaseRepo):
             return query
         if filter.location_id is not None:
             query = query.where(PredictedLog.location_id == filter.location_id)
+        if filter.location_ids is not None:
+            query = query.where(PredictedLog.location_id.in_(filter.location_ids))
         if filter.created_at_lt is not None:
             query = query.where(PredictedLog.created_at < filter.created_at_lt)
         if filter.created_at_gt is not None:
@@ -40,5 +47,32 @@ class PredictedLogRepo(BaseRepo):
         query = self.build_query(query, filter).order_by(asc(PredictedLog.predict_time), asc(PredictedLog.created_at))
         return query.all()
 
+    def get_by_memo_keys(self, db_session: Session, keys: list[tuple[int, int, str]]) -> list[PredictedLog]:
+        '''keys are location id, predict time, model version, get all of them in one query'''
+        if len(keys) == 0:
+            return []
+        return db_session.query(PredictedLog).where(
+            tuple_(*[getattr(PredictedLog, col) for col in MEMO_KEY_COLUMNS]).in_(keys)).all()
+
+    def insert_ignore_conflict(self, db_session: Session, predicted_logs: list[PredictedLog]):
+        '''
+        insert in one statement, log whose memo key is already in db is skipped
+        value of inserted log is added to quartile sketch of its day in the same transaction
+        '''
+        if len(predicted_logs) == 0:
+            return
+        inserted_rows = db_session.execute(
+            insert(PredictedLog).on_conflict_do_nothing(index_elements=MEMO_KEY_COLUMNS).returning(
+                PredictedLog.predict_time, PredictedLog.value),
+            [{key: value for key, value in log.as_dict().items() if key not in ["id", "created_at", "updated_at"]}
+             for log in predicted_logs],
+        ).all()
+        map_time_to_values: dict[int, list[float]] = {}
+        for predict_time, value in inserted_rows:
+            if value is not None:
+                map_time_to_values.setdefault(predict_time, []).append(value)
+        prediction_quartile_repo.add_predictions(db_session, map_time_to_values)
+        db_session.commit()
+
 
 predicted_log_repo = PredictedLogRepo(PredictedLog)
@@ -0,0 +1,59 @@
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.internal.dao.predicted_log import PredictedLog
+from app.internal.dao.prediction_quartile import PredictionQuartile
+from app.internal.repository.base import BaseRepo
+from app.internal.util.sketch_util.kll_sketch import KLLSketch
+
+QUARTILES = [0.25, 0.5, 0.75]
+
+
+class PredictionQuartileRepo(BaseRepo[PredictionQuartile]):
+
+    def get_by_time(self, db_session: Session, time: int) -> PredictionQuartile:
+        return db_session.query(PredictionQuartile).where(PredictionQuartile.time == time).first()
+
+    def _get_for_update(self, db_session: Session, time: int) -> PredictionQuartile:
+        '''lock quartile of the day until commit so concurrent writer merge into the sketch one after another'''
+        quartile = db_session.query(PredictionQuartile).where(PredictionQuartile.time == time).with_for_update().first()
+        if quartile is not None:
+            return quartile
+        db_session.execute(insert(PredictionQuartile).on_conflict_do_nothing(index_elements=["time"]), [{"time": time}])
+        return db_session.query(PredictionQuartile).where(PredictionQuartile.time == time).with_for_update().one()
+
+    def add_predictions(self, db_session: Session, map_time_to_values: dict[int, list[float]]):
+        '''
+        add predicted values into sketch of their day and refresh quartile threshold, caller should commit
+        values must be already flushed to predicted log, day which has no sketch yet is built from all of its
+        predicted log once
+        days are locked in ascending order so concurrent writers of overlapping days cannot deadlock
+        '''
+        for time in sorted(map_time_to_values):
+            values = map_time_to_values[time]
+            quartile = self._get_for_update(db_session, time)
+            if quartile.sketch is None:
+                sketch = KLLSketch()
+                sketch.update_many(value for value, in db_session.query(PredictedLog.value).where(
+                    PredictedLog.predict_time == time, PredictedLog.value.is_not(None)).yield_per(10000))
+            else:
+                sketch = KLLSketch.from_bytes(quartile.sketch)
+                sketch.update_many(values)
+            quartile.sketch = sketch.to_bytes()
+            quartile.quartile_threshold = sketch.get_quantiles(QUARTILES)
+        db_session.flush()
+
+    def get_or_build(self, db_session: Session, time: int) -> PredictionQuartile:
+        '''return None without writing if the day has no predicted log'''
+        quartile = self.get_by_time(db_session, time)
+        if quartile is None:
+            if db_session.query(PredictedLog.id).where(
+                    PredictedLog.predict_time == time, PredictedLog.value.is_not(None)).first() is None:
+                return None
+            self.add_predictions(db_session, {time: []})
+            db_session.commit()
+            quartile = self.get_by_time(db_session, time)
+        return quartile
+
+
+prediction_quartile_repo = PredictionQuartileRepo(PredictionQuartile)
@@ -0,0 +1,35 @@
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.internal.dao.ward_risk_daily import WardRiskDaily
+from app.internal.repository.base import BaseRepo
+from app.internal.util.time_util import time_util
+
+COUNT_COLUMNS = ["safe_count", "normal_count", "low_risk_count", "high_risk_count"]
+
+
+class WardRiskDailyRepo(BaseRepo[WardRiskDaily]):
+
+    def get_by_time_and_district(self, db_session: Session, time: int, district_code: str,
+                                 model_version: str) -> WardRiskDaily:
+        return db_session.query(WardRiskDaily).where(
+            WardRiskDaily.time == time, WardRiskDaily.district_code == district_code,
+            WardRiskDaily.model_version == model_version).first()
+
+    def upsert_all(self, db_session: Session, ward_risks: list[WardRiskDaily]):
+        '''insert in one statement, rollup of a day, district and model version which is already in db is replaced'''
+        if len(ward_risks) == 0:
+            return
+        stmt = insert(WardRiskDaily)
+        db_session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["time", "district_code", "model_version"],
+                set_={**{col: getattr(stmt.excluded, col) for col in COUNT_COLUMNS},
+                      "updated_at": time_util.datetime_to_ts(time_util.now())}),
+            [{key: value for key, value in ward_risk.as_dict().items() if key not in ["id", "created_at", "updated_at"]}
+             for ward_risk in ward_risks],
+        )
+        db_session.commit()
+
+
+ward_risk_daily_repo = WardRiskDailyRepo(WardRiskDaily)
@@ -4,6 +4,7 @@ from app.internal.dao.time_window import TimeWindow
 from app.internal.dao.weather_log import WeatherLog
 from app.internal.repository.base import BaseFilterType, BaseRepo
 
+from sqlalchemy import Row, desc, select
 from sqlalchemy.orm import Session, Query
 from pydantic import BaseModel
 
@@ -50,5 +51,19 @@ class WeatherLogRepo(BaseRepo[WeatherLog]):
         query = db_session.query(WeatherLog)
         return self._build_filter_query(query, filter).all()
 
+    def get_latest_by_location_ids(self, db_session: Session, location_ids: Iterable[int],
+                                   columns: list[str] = None) -> list[Row]:
+        '''
+        latest weather log of each location, only location id and the columns are loaded
+        it reads backward on index of location id and date time instead of loading every weather log
+        '''
+        location_ids = list(location_ids)
+        if len(location_ids) == 0:
+            return []
+        selected_columns = [WeatherLog.location_id] + [getattr(WeatherLog, col) for col in columns or []]
+        stmt = select(*selected_columns).where(WeatherLog.location_id.in_(location_ids)).distinct(
+            WeatherLog.location_id).order_by(WeatherLog.location_id, desc(WeatherLog.date_time), desc(WeatherLog.id))
+        return db_session.execute(stmt).all()
+
 
 weather_log_repo = WeatherLogRepo(WeatherLog)
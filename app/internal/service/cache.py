@@ -0,0 +1,12 @@
+from app.config import env_var
+from app.internal.util.cache_util.cache_backend import KeyedCache, cache_backend
+from app.internal.util.cache_util.ttl_lru_cache import TTLLRUCache
+
+# (start date timestamp,) map to quartile threshold of that day
+quartile_cache = KeyedCache(cache_backend, "quartile", ttl=env_var.QUARTILE_CACHE_TTL)
+# (start date timestamp, model version) map to rate name map to number of ward in the whole city
+city_ward_risk_cache: TTLLRUCache[tuple[int, str], dict[str, int]] = TTLLRUCache(
+    max_size=32, ttl=env_var.CITY_WARD_RISK_CACHE_TTL)
+# (start date timestamp, z, x, y) map to (data, etag) of the tile, None if the day has no tile there
+heatmap_tile_cache: TTLLRUCache[tuple[int, int, int, int], tuple[bytes, str]] = TTLLRUCache(
+    max_size=env_var.HEATMAP_TILE_CACHE_SIZE, ttl=env_var.HEATMAP_TILE_CACHE_TTL)
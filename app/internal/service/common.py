@@ -1,48 +1,32 @@
-import concurrent.futures as ft
 import logging
 from typing import Coroutine, Iterable, Optional, Protocol, Sequence
-import numpy as np
+from sqlalchemy import Row, func, or_
 from sqlalchemy.orm import Session
 
-from app.adapter.visual_crossing_adapter import GetWeatherRequest, visual_crossing_adapter
 from app.api.request.get_summary_request import GetWeatherSummaryRequest
 from app.api.request.get_weather_detail_request import GetWeatherDetailRequest
-from app.common.constant import SUCCESS_STATUS_CODE
 from app.common.context import Context
-from app.common.exception import ThirdServiceException
 from app.api.request.get_summary_request import Location as RequestLocation
 from app.internal.dao.location import Location
-from app.internal.dao.predicted_log import PredictedLog
-from app.internal.dao.prediction_quartile import PredictionQuartile
 from app.internal.dao.third_party_location import ThirdPartyLocation
 from app.internal.dao.weather_log import WeatherLog
+from app.internal.model.model.data_loader import get_or_fetch_weather_logs
 from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.model.model.weather_log_cache import weather_log_cache
+from app.internal.repository.constants import FLOATING_POINT_THRESHOLD
 from app.internal.repository.location import LocationFilter, location_repo
-from app.internal.repository.weather_log import WeatherLogFilter, weather_log_repo
+from app.internal.repository.weather_log import weather_log_repo
 from app.internal.repository.third_party_location import third_party_location_repo, ThirdPartyLocationFilter
+from app.internal.service.quartile_service import classify_quartile, get_map_key_to_quartile, get_quartile_threshold
 from app.internal.util.time_util import time_util
 
 
+SUMMARY_WEATHER_LOG_COLUMNS = ["precipitation", "temperature"]
+
+
 def get_map_date_to_quartile(ctx: Context, prediction: float, time: int) -> int:
     db_session = ctx.extract_db_session()
-    time = time_util.to_start_date_timestamp(time)
-    quartile = db_session.query(PredictionQuartile).where(PredictionQuartile.time == time).first()
-    quartile_threshold = []
-    if quartile is not None:
-        quartile_threshold = quartile.quartile_threshold
-    else:
-        pred_log = db_session.query(PredictedLog).where(PredictedLog.predict_time == time).all()
-        if len(pred_log) > 0:
-            log_values = [log.value for log in pred_log]
-            quartile_threshold = np.quantile(log_values, [0.25, 0.5, 0.75]).tolist()
-            db_session.add(PredictionQuartile(
-                time=time,
-                quartile_threshold=quartile_threshold
-            ))
-    for idx, thrs in enumerate(quartile_threshold):
-        if prediction < thrs:
-            return idx
-    return len(quartile_threshold) - 1
+    return int(classify_quartile(get_quartile_threshold(db_session, time), [prediction])[0])
 
 
 class LocationFilterSupported(Protocol):
@@ -86,35 +70,50 @@ def _find_location_by_long_lat(ctx: Context, location_request: LocationFilterSup
     return location, third_party_location
 
 
+def find_locations_by_long_lat(ctx: Context, location_requests: Sequence[LocationFilterSupported]) -> list[Location]:
+    '''
+    location of each request coordinate, read in one query and missing one is created in one flush
+    None for request without coordinate
+    '''
+    db_session = ctx.extract_db_session()
+    coordinates = list(dict.fromkeys(
+        (location_request.lng, location_request.lat) for location_request in location_requests
+        if location_request.lat is not None and location_request.lng is not None))
+    if len(coordinates) == 0:
+        return [None] * len(location_requests)
+    locations = db_session.query(Location).where(or_(*[
+        (func.abs(Location.longitude - lng) < FLOATING_POINT_THRESHOLD)
+        & (func.abs(Location.latitude - lat) < FLOATING_POINT_THRESHOLD) for lng, lat in coordinates])).order_by(
+        Location.id).all()
+    map_coordinate_to_location: dict[tuple[float, float], Location] = {}
+    for lng, lat in coordinates:
+        location = next((location for location in locations
+                         if abs(location.longitude - lng) < FLOATING_POINT_THRESHOLD
+                         and abs(location.latitude - lat) < FLOATING_POINT_THRESHOLD), None)
+        # if this is new location create new record in db
+        map_coordinate_to_location.update({(lng, lat): location or Location(longitude=lng, latitude=lat)})
+    db_session.add_all([location for location in map_coordinate_to_location.values() if location.id is None])
+    db_session.flush()  # flush to generate location id
+    return [map_coordinate_to_location.get((location_request.lng, location_request.lat))
+            for location_request in location_requests]
+
+
 def predict_with_location_ids(ctx: Context, model: Nb2MosquittoModel, location_ids: Iterable[int],
                               time: int) -> tuple[dict[int, float],
                                                   dict[int, int]]:
     db_session = ctx.extract_db_session()
-    # define share resource
-    map_location_id_to_prediction: dict[int, float] = {}
-    map_location_id_to_quarttile: dict[int, int] = {}
-
-    with ft.ThreadPoolExecutor() as pool:
-        ft_pool = {
-            pool.submit(
-                model.predict_with_location_id, db_session=db_session, location_id=location, date_time=time): location
-            for location in location_ids}
-        for future in ft.as_completed(ft_pool.keys()):
-            location = ft_pool.get(future)
-            prediction = future.result()
-            map_location_id_to_prediction.update({location: prediction.count})
-            map_location_id_to_quarttile.update({
-                location:  get_map_date_to_quartile(ctx, prediction.count, time)
-            })
+    predictions = model.predict_batch(location_ids=location_ids, date_time=time, db_session=db_session)
+    map_location_id_to_prediction = {location: prediction.count for location, prediction in predictions.items()}
+    map_location_id_to_quarttile = get_map_key_to_quartile(db_session, map_location_id_to_prediction, time)
 
     return map_location_id_to_prediction, map_location_id_to_quarttile
 
 
-def get_weather_log_with_location_ids(ctx: Context, location_ids: Iterable[int]) -> dict[int, WeatherLog]:
+def get_weather_log_with_location_ids(ctx: Context, location_ids: Iterable[int]) -> dict[int, Row]:
+    '''latest weather of each location, only columns which summary response use are loaded'''
     db_session = ctx.extract_db_session()
-    weather_logs = weather_log_repo.filter_all(db_session=db_session, filter=WeatherLogFilter(
-        location_ids=location_ids
-    ))
+    weather_logs = weather_log_repo.get_latest_by_location_ids(
+        db_session, location_ids, columns=SUMMARY_WEATHER_LOG_COLUMNS)
     map_location_id_to_weather_log = {log.location_id: log for log in weather_logs}
     return map_location_id_to_weather_log
 
@@ -161,43 +160,31 @@ def get_map_date_to_weather_log(
         int, WeatherLog]:
     db_session = ctx.extract_db_session()
     resp: dict[int, WeatherLog] = {}
-
-    for time in list_time:
-
-        query = db_session.query(WeatherLog).where(
-            WeatherLog.location_id == location.id, WeatherLog.date_time == time)
-        weather_log = query.first()
-        if weather_log is None:
-            # if we cannot get this weather log we will try to call to visual crossing to get weather
-            req = GetWeatherRequest(
-                longitude=location.longitude,
-                latitude=location.latitude,
-                start_date_time=time_util.to_start_date_timestamp(time),
-                end_date_time=time_util.to_end_date_timestamp(time),
-            )
-            weather_log_resp = visual_crossing_adapter.get_weather_log(req)
-            if weather_log_resp.code != SUCCESS_STATUS_CODE:
-                raise ThirdServiceException()
-            data = weather_log_resp.data[0]
-            # save it without time window id, will have celery job to update it later
-            weather_log = WeatherLog(**data.dict(), location_id=location.id)
-            weather_log_repo.save(db_session, weather_log)
-        resp.update({time: weather_log})
+    map_day_to_time = {time_util.to_start_date_timestamp(time): time for time in list_time}
+    cached_snapshots = weather_log_cache.get_many([(location.id, day) for day in map_day_to_time.keys()])
+    for (_, day), snapshot in cached_snapshots.items():
+        # detached copy, only its columns can be read
+        resp.update({map_day_to_time[day]: WeatherLog(**snapshot)})
+
+    missing_times = [time for time in list_time if time not in resp]
+    if len(missing_times) == 0:
+        return resp
+    map_day_to_weather_log = get_or_fetch_weather_logs(db_session, location, missing_times)
+    for time in missing_times:
+        resp.update({time: map_day_to_weather_log[time_util.to_start_date_timestamp(time)]})
+    weather_log_cache.set_many({(location.id, time_util.to_start_date_timestamp(time)): resp[time].as_dict()
+                                for time in missing_times})
 
     return resp
 
 
 def get_map_date_to_prediction(
-        ctx: Context, model: Nb2MosquittoModel, location_id: int, list_time: list[int]) -> tuple[dict[
+        ctx: Context, model: Nb2MosquittoModel, location_id: int, start_time: int, end_time: int) -> tuple[dict[
         int, float], dict[int, int]]:
-    map_time_to_pred: dict[int, float] = {}
-    map_time_to_quartile: dict[int, int] = {}
+    '''predict every day from start time, end time excluded, in one model call'''
     db_session = ctx.extract_db_session()
-
-    # define task
-    for time in list_time:
-        prediction = model.predict_with_location_id(
-            location_id=location_id, date_time=time, db_session=db_session)
-        map_time_to_pred.update({time: prediction.count})
-        map_time_to_quartile.update({time: get_map_date_to_quartile(ctx, prediction.count, time)})
+    predictions = model.predict_interval(
+        location_id=location_id, start_time=start_time, end_time=end_time, db_session=db_session)
+    map_time_to_pred = {time: prediction.count for time, prediction in predictions.items()}
+    map_time_to_quartile = {time: get_map_date_to_quartile(ctx, pred, time) for time, pred in map_time_to_pred.items()}
     return map_time_to_pred, map_time_to_quartile
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class PredictionGridDTO:
+    location_ids: list[int]
+    '''internal location id of each requested location, None if it cannot be found'''
+    date_times: list[int]
+    map_key_to_prediction: dict[tuple[int, int], float]
+    '''(location id, date time) map to prediction'''
+    map_key_to_quartile: dict[tuple[int, int], int]
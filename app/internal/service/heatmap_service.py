@@ -0,0 +1,81 @@
+import hashlib
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import env_var
+from app.internal.dao.heatmap_tile import HeatmapTile
+from app.internal.dao.location import Location
+from app.internal.dao.ward import Ward
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.repository.heatmap_tile import heatmap_tile_repo
+from app.internal.service.cache import heatmap_tile_cache
+from app.internal.util.tile_util.tile_util import lng_lat_to_tile_pixel
+from app.internal.util.time_util import time_util
+
+# one record per non empty pixel of the tile, little endian so tile can be read by browser DataView
+TILE_DTYPE = np.dtype([("x", "u1"), ("y", "u1"), ("weight", "<f4")])
+
+
+def encode_tile(pixel_xs: np.ndarray, pixel_ys: np.ndarray, weights: np.ndarray) -> bytes:
+    '''sum weight of points in the same pixel then pack them ordered by pixel y, x'''
+    pixels = pixel_ys.astype(np.int64) * 256 + pixel_xs.astype(np.int64)
+    unique_pixels, inverse = np.unique(pixels, return_inverse=True)
+    pixel_weights = np.zeros(len(unique_pixels), dtype=np.float64)
+    np.add.at(pixel_weights, inverse, weights)
+    records = np.empty(len(unique_pixels), dtype=TILE_DTYPE)
+    records["x"] = unique_pixels % 256
+    records["y"] = unique_pixels // 256
+    records["weight"] = pixel_weights
+    return records.tobytes()
+
+
+def decode_tile(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=TILE_DTYPE)
+
+
+def get_etag(data: bytes) -> str:
+    return f'"{hashlib.sha1(data).hexdigest()}"'
+
+
+def render_heatmap_tiles(db_session: Session, model: Nb2MosquittoModel, time: int,
+                         min_zoom: int = env_var.HEATMAP_TILE_MIN_ZOOM,
+                         max_zoom: int = env_var.HEATMAP_TILE_MAX_ZOOM) -> list[HeatmapTile]:
+    '''predict every ward at the day of time then bin its weight into tiles of each zoom, replace tiles of the day'''
+    time = time_util.to_start_date_timestamp(time)
+    wards = db_session.query(Location.id, Location.longitude, Location.latitude).join(
+        Ward, Ward.location_id == Location.id).all()
+    predictions = model.predict_batch(
+        location_ids=[location_id for location_id, _, _ in wards], date_time=time, db_session=db_session)
+    points = [(lng, lat, predictions[location_id].count) for location_id, lng, lat in wards
+              if location_id in predictions and lng is not None and lat is not None]
+
+    tiles: list[HeatmapTile] = []
+    if len(points) > 0:
+        lngs, lats, counts = (np.array(values, dtype=np.float64) for values in zip(*points))
+        # same contrast adjustment as prediction api
+        weights = counts - counts.min() + 1
+        for z in range(min_zoom, max_zoom + 1):
+            tile_xs, tile_ys, pixel_xs, pixel_ys = lng_lat_to_tile_pixel(lngs, lats, z)
+            for x, y in sorted(set(zip(tile_xs.tolist(), tile_ys.tolist()))):
+                mask = (tile_xs == x) & (tile_ys == y)
+                data = encode_tile(pixel_xs[mask], pixel_ys[mask], weights[mask])
+                tiles.append(HeatmapTile(time=time, z=z, x=x, y=y, data=data, etag=get_etag(data)))
+    heatmap_tile_repo.replace_day(db_session, time, tiles)
+    # tiles of other api process expire after HEATMAP_TILE_CACHE_TTL
+    heatmap_tile_cache.delete_many([key for key in heatmap_tile_cache.keys() if key[0] == time])
+    logging.info(f"render {len(tiles)} heatmap tiles of {len(points)} wards at {time}")
+    return tiles
+
+
+def get_heatmap_tile(db_session: Session, time: int, z: int, x: int, y: int) -> tuple[bytes, str]:
+    '''return data and etag of the tile, None if the day is not rendered or has no ward in the tile'''
+    key = (time_util.to_start_date_timestamp(time), z, x, y)
+    cached = heatmap_tile_cache.get_many([key])
+    if key in cached:
+        return cached[key]
+    tile = heatmap_tile_repo.get_tile(db_session, *key)
+    resp = (tile.data, tile.etag) if tile is not None else None
+    # empty tile is cached too, most of the map has no ward
+    heatmap_tile_cache.set(key, resp)
+    return resp
@@ -5,14 +5,16 @@ import datetime
 import logging
 import numpy as np
 
+from app.api.request.get_prediction_grid_request import GetPredictionGridRequest
 from app.api.request.get_prediction_request import GetPredictionRequest
 from app.common.context import Context
-from app.common.exception import ThirdServiceException
 from app.internal.dao.location import Location
 from app.internal.model.model.model import Nb2MosquittoModel
 from app.internal.repository.third_party_location import ThirdPartyLocationFilter, third_party_location_repo
-from app.internal.service.common import get_map_location_by_location_support_filter
+from app.internal.service.common import find_locations_by_long_lat, get_map_location_by_location_support_filter
 from app.internal.service.dto.prediction_dto import PredictionDTO
+from app.internal.service.dto.prediction_grid_dto import PredictionGridDTO
+from app.internal.service.quartile_service import get_map_key_to_quartile
 
 
 def get_prediction(ctx: Context, model: Nb2MosquittoModel, request: GetPredictionRequest) -> dict[int, float]:
@@ -21,16 +23,46 @@ def get_prediction(ctx: Context, model: Nb2MosquittoModel, request: GetPredictio
     result: dict[int, float] = {}
     map_location, _ = get_map_location_by_location_support_filter(ctx, request.locations)
 
-    # define task
-
-    for location_id, location in map_location.items():
-        try:
-            prediction = model.predict_with_location_id(
-                location_id=location_id, date_time=request.predict_date, db_session=db_session)
-            logging.info(f"prediction: {prediction.count}")
-        except ThirdServiceException:
-            logging.info("third party has no data for this locations")
-        if prediction is not None and not np.isinf(prediction.count):
-            result.update({location.id: prediction.count})
+    predictions = model.predict_batch(
+        location_ids=map_location.keys(), date_time=request.predict_date, db_session=db_session)
+    for location_id, prediction in predictions.items():
+        logging.info(f"prediction: {prediction.count}")
+        if not np.isinf(prediction.count):
+            result.update({location_id: prediction.count})
 
     return result
+
+
+def get_prediction_grid(ctx: Context, model: Nb2MosquittoModel, request: GetPredictionGridRequest) -> PredictionGridDTO:
+    '''predict every requested location at every day of the range in one batch'''
+    db_session = ctx.extract_db_session()
+    location_codes = [location.location_code for location in request.locations if location.location_code is not None]
+    third_party_locations = third_party_location_repo.filter_all(db_session, ThirdPartyLocationFilter(
+        location_codes=location_codes)) if len(location_codes) > 0 else []
+    map_location_code_to_location_id = {location.location_code: location.location_id
+                                        for location in third_party_locations if location.location_id is not None}
+    # every coordinate without known location code is resolved in one query
+    internal_locations = iter(find_locations_by_long_lat(ctx, [
+        location for location in request.locations if location.location_code not in map_location_code_to_location_id]))
+    location_ids: list[int] = []
+    for location in request.locations:
+        location_id = map_location_code_to_location_id.get(location.location_code)
+        if location.location_code not in map_location_code_to_location_id:
+            internal_location = next(internal_locations)
+            location_id = internal_location.id if internal_location is not None else None
+        location_ids.append(location_id)
+
+    predictions = model.predict_grid(
+        location_ids=[location_id for location_id in location_ids if location_id is not None],
+        start_time=request.start_time, end_time=request.end_time, db_session=db_session)
+    map_key_to_prediction = {key: prediction.count for key, prediction in predictions.items()}
+    date_times = model.get_interval_date_times(request.start_time, request.end_time)
+    map_date_time_to_predictions: dict[int, dict[tuple[int, int], float]] = {date_time: {} for date_time in date_times}
+    for key, prediction in map_key_to_prediction.items():
+        map_date_time_to_predictions[key[1]].update({key: prediction})
+    map_key_to_quartile: dict[tuple[int, int], int] = {}
+    for date_time, predictions_of_date in map_date_time_to_predictions.items():
+        # every location of a day share one threshold
+        map_key_to_quartile.update(get_map_key_to_quartile(db_session, predictions_of_date, date_time))
+    return PredictionGridDTO(location_ids=location_ids, date_times=date_times,
+                             map_key_to_prediction=map_key_to_prediction, map_key_to_quartile=map_key_to_quartile)
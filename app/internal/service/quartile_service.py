@@ -0,0 +1,40 @@
+from typing import Hashable, Iterable, TypeVar
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.internal.repository.prediction_quartile import prediction_quartile_repo
+from app.internal.service.cache import quartile_cache
+from app.internal.util.time_util import time_util
+
+K = TypeVar("K", bound=Hashable)
+
+
+def get_quartile_threshold(db_session: Session, time: int) -> list[float]:
+    '''quartile threshold of the day of time, it is kept up to date by sketch on every predicted log write'''
+    time = time_util.to_start_date_timestamp(time)
+    quartile_threshold = quartile_cache.get((time,))
+    if quartile_threshold is not None:
+        return quartile_threshold
+    quartile = prediction_quartile_repo.get_or_build(db_session, time)
+    if quartile is None or not quartile.quartile_threshold:
+        return []
+    quartile_threshold = [float(threshold) for threshold in quartile.quartile_threshold]
+    quartile_cache.set((time,), quartile_threshold)
+    return quartile_threshold
+
+
+def classify_quartile(quartile_threshold: list[float], predictions: Iterable[float]) -> np.ndarray:
+    '''
+    index of the first threshold which is greater than prediction, prediction above every threshold is in the last
+    quartile index, -1 if there is no threshold
+    '''
+    predictions = np.fromiter(predictions, dtype=np.float64)
+    if len(quartile_threshold) == 0:
+        return np.full(len(predictions), -1, dtype=np.int64)
+    return np.minimum(np.searchsorted(quartile_threshold, predictions, side="right"), len(quartile_threshold) - 1)
+
+
+def get_map_key_to_quartile(db_session: Session, map_key_to_prediction: dict[K, float], time: int) -> dict[K, int]:
+    '''classify predictions of the same day in one pass'''
+    quartiles = classify_quartile(get_quartile_threshold(db_session, time), map_key_to_prediction.values())
+    return {key: int(quartile) for key, quartile in zip(map_key_to_prediction.keys(), quartiles)}
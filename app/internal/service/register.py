@@ -4,21 +4,26 @@ import logging
 from typing import Protocol
 from sqlalchemy.orm import Session
 
+from app.api.request.get_prediction_grid_request import GetPredictionGridRequest
 from app.api.request.get_prediction_request import GetPredictionRequest
-from app.api.response.common import Rate
+from app.api.response.get_prediction_grid_response import GetPredictionGridResponse
 from app.api.response.get_prediction_response import GetPredictionResponse
 from app.api.request.get_weather_detail_request import GetWeatherDetailRequest
 from app.api.response.get_weather_detail_response import GetWeatherDetailResponse
 from app.api.request.get_summary_request import GetWeatherSummaryRequest
 from app.api.response.get_summary_response import GetHCMCProviceSummaryResponse, GetWeatherSummaryResponse, HCMCSummaryResponseData
 from app.common.context import Context
+from app.common.exception import ModelNotFoundException
 from app.config import env_var
+from app.internal.model.model.constants import DEFAULT_TIME_WINDOW_ID
 from app.internal.model.model.model import Nb2MosquittoModel
-from app.internal.repository.ward import ward_repo
-from app.internal.service.common import predict_with_location_ids
-from app.internal.service.prediction_service import get_prediction
+from app.internal.model.model.registry import model_registry
+from app.internal.service.heatmap_service import get_heatmap_tile
+from app.internal.service.prediction_service import get_prediction, get_prediction_grid
 from app.internal.service.summary_service import get_weather_summary,  get_weather_detail
 from app.internal.service.transformer.prediction_transformer import PredictionTransformer
+from app.internal.service.ward_risk_service import get_city_rate_counts
+from app.internal.repository.time_window import time_window_repo
 from app.internal.repository.weather_log import weather_log_repo
 from app.internal.util.time_util import time_util
 
@@ -39,28 +44,46 @@ class IService(Protocol):
     @abstractmethod
     def get_hcmc_summary(self, ctx: Context) -> GetHCMCProviceSummaryResponse: ...
 
+    @abstractmethod
+    def get_prediction_grid(self, ctx: Context, request: GetPredictionGridRequest) -> GetPredictionGridResponse: ...
+
+    @abstractmethod
+    def get_heatmap_tile(self, ctx: Context, time: int, z: int, x: int, y: int) -> tuple[bytes, str]: ...
+
 
 class Service(IService):
 
     def __init__(self) -> None:
-        if env_var.IS_EXPERIMENT:
-            # load list of available model
-            return
-        # if not experiment init first models
-        self.models = [Nb2MosquittoModel(1)]
+        # load default model, other model is loaded when it is first requested
+        model_registry.get(DEFAULT_TIME_WINDOW_ID)
+        model_registry.start_polling()
         self.transformer = PredictionTransformer()
 
+    def get_model(self, ctx: Context) -> Nb2MosquittoModel:
+        '''
+        get model once per request, so a request is served by one version even if it is swapped
+        in experiment, request can choose time window and version by header, default is latest version of default
+        time window
+        '''
+        if not env_var.IS_EXPERIMENT:
+            return model_registry.get(DEFAULT_TIME_WINDOW_ID)
+        time_window_id = ctx.extract_model_time_window_id()
+        if time_window_id is not None and time_window_repo.get_by_id(ctx.extract_db_session(), time_window_id) is None:
+            # model of unknown time window would be trained on nothing
+            raise ModelNotFoundException()
+        return model_registry.get(time_window_id or DEFAULT_TIME_WINDOW_ID, ctx.extract_model_version())
+
     def get_prediction(self, ctx: Context,  request: GetPredictionRequest) -> GetPredictionResponse:
-        data = get_prediction(ctx, self.models[0], request)
+        data = get_prediction(ctx, self.get_model(ctx), request)
         return self.transformer.prediction_dto_to_response(request, data)
 
     def get_weather_summary(self, ctx: Context, request: GetWeatherSummaryRequest) -> GetWeatherSummaryResponse:
-        weather_summary_dto = get_weather_summary(ctx, self.models[0],  request)
+        weather_summary_dto = get_weather_summary(ctx, self.get_model(ctx),  request)
         _logger.info(weather_summary_dto)
         return self.transformer.summary_dto_to_summary_response(request, weather_summary_dto)
 
     def get_weather_detail(self, ctx: Context, request: GetWeatherDetailRequest) -> GetWeatherDetailResponse:
-        weather_detail_dto = get_weather_detail(ctx, self.models[0], request)
+        weather_detail_dto = get_weather_detail(ctx, self.get_model(ctx), request)
         if weather_detail_dto is None:
             return GetWeatherDetailResponse()
         _logger.info(weather_detail_dto)
@@ -68,19 +91,15 @@ class Service(IService):
 
     def get_hcmc_summary(self, ctx: Context) -> GetHCMCProviceSummaryResponse:
         db_session = ctx.extract_db_session()
-        wards = ward_repo.get_all(db_session)
-
-        map_location_id_to_location = {ward.location_id: ward.location for ward in wards}
-        _, map_location_to_quartile = predict_with_location_ids(
-            ctx=ctx, model=self.models[0], location_ids=list(map_location_id_to_location.keys()),
-            time=time_util.datetime_to_ts(time_util.now()))
-        ward_rate_list = [0]*4
-        for ward in wards:
-            ward_rate_list[map_location_to_quartile.get(ward.location_id)] += 1
-
-        return GetHCMCProviceSummaryResponse(
-            data=HCMCSummaryResponseData(
-                **{val: ward_rate_list[idx] for idx, val in enumerate(Rate.__members__)}))
+        rate_counts = get_city_rate_counts(db_session, self.get_model(ctx), time_util.datetime_to_ts(time_util.now()))
+        return GetHCMCProviceSummaryResponse(data=HCMCSummaryResponseData(**rate_counts))
+
+    def get_prediction_grid(self, ctx: Context, request: GetPredictionGridRequest) -> GetPredictionGridResponse:
+        data = get_prediction_grid(ctx, self.get_model(ctx), request)
+        return self.transformer.prediction_grid_dto_to_response(request, data)
+
+    def get_heatmap_tile(self, ctx: Context, time: int, z: int, x: int, y: int) -> tuple[bytes, str]:
+        return get_heatmap_tile(ctx.extract_db_session(), time, z, x, y)
 
 
 service = Service()
@@ -2,11 +2,11 @@
 
 import concurrent.futures as ft
 from dataclasses import dataclass
-import datetime
 import json
 import logging
 from typing import Coroutine, Iterable, Optional, Sequence
 import numpy as np
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
 
 from app.api.request.get_summary_request import GetWeatherSummaryRequest
@@ -36,7 +36,7 @@ def get_weather_summary(ctx: Context, model: Nb2MosquittoModel, request: GetWeat
 
     map_location_id_to_prediction: dict[int, float] = {}
     map_location_to_quartile: dict[int, int] = {}
-    map_location_id_to_weather_log: dict[int, WeatherLog] = {}
+    map_location_id_to_weather_log: dict[int, Row] = {}
     # create tasks
 
     map_location_id_to_prediction, map_location_to_quartile = predict_with_location_ids(
@@ -71,16 +71,15 @@ def get_weather_detail(ctx: Context, model: Nb2MosquittoModel,
         internal_location, third_party_location = _find_location_by_long_lat(
             ctx, request)
 
-    start_time_dt = time_util.ts_to_datetime(request.start_time)
-    time_interval = time_util.ts_to_datetime(request.end_time) - start_time_dt
-    list_time = [time_util.datetime_to_ts(start_time_dt+datetime.timedelta(i)) for i in range(time_interval.days)]
+    # same days as prediction so both maps have identical keys
+    list_time = model.get_interval_date_times(request.start_time, request.end_time)
 
     map_date_to_prediction: dict[int, float] = {}
     map_date_to_quartile: dict[int, int] = {}
     map_date_to_weather_log: dict[int, WeatherLog] = {}
 
     map_date_to_prediction, map_date_to_quartile = get_map_date_to_prediction(
-        ctx, model, location_id=internal_location.id, list_time=list_time)
+        ctx, model, location_id=internal_location.id, start_time=request.start_time, end_time=request.end_time)
 
     map_date_to_weather_log = get_map_date_to_weather_log(
         ctx, model, internal_location, list_time)
@@ -1,13 +1,16 @@
 
 
 import logging
+from app.api.request.get_prediction_grid_request import GetPredictionGridRequest
 from app.api.request.get_prediction_request import GetPredictionRequest
+from app.api.response.get_prediction_grid_response import GetPredictionGridResponse, PredictionGridData, PredictionGridLocation
 from app.api.request.get_summary_request import GetWeatherSummaryRequest
 from app.api.request.get_weather_detail_request import GetWeatherDetailRequest
 from app.api.response.get_prediction_response import GetPredictionResponse, PredictionData
 from app.api.response.get_summary_response import GetWeatherSummaryResponse, SummaryLocationInfo
 from app.api.response.get_weather_detail_response import GetWeatherDetailResponse, LocationDetail, LocationDetailData, LocationDetailGeometry
 from app.internal.service.dto.prediction_dto import PredictionDTO
+from app.internal.service.dto.prediction_grid_dto import PredictionGridDTO
 from app.internal.repository.weather_log import weather_log_repo, WeatherLogFilter
 from app.internal.service.dto.weather_detail_dto import WeatherDetailDTO
 from app.internal.service.dto.weather_summary_dto import WeatherSummaryDTO
@@ -93,3 +96,14 @@ class PredictionTransformer:
         return GetWeatherDetailResponse(
             data=data
         )
+
+    def prediction_grid_dto_to_response(
+            self, request: GetPredictionGridRequest, dto: PredictionGridDTO) -> GetPredictionGridResponse:
+        data = PredictionGridData(dates=dto.date_times)
+        for location, location_id in zip(request.locations, dto.location_ids):
+            data.locations.append(PredictionGridLocation(
+                idx=location.idx, location_code=location.location_code, lat=location.lat, lng=location.lng))
+            data.values.append([dto.map_key_to_prediction.get((location_id, date)) for date in dto.date_times])
+            data.rates.append([MAP_IDX_TO_RATE.get(dto.map_key_to_quartile.get((location_id, date)))
+                               for date in dto.date_times])
+        return GetPredictionGridResponse(data=data)
@@ -0,0 +1,58 @@
+import logging
+from sqlalchemy.orm import Session
+
+from app.api.response.common import Rate
+from app.internal.dao.ward import Ward
+from app.internal.dao.ward_risk_daily import CITY_DISTRICT_CODE, WardRiskDaily
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.repository.ward_risk_daily import COUNT_COLUMNS, ward_risk_daily_repo
+from app.internal.service.cache import city_ward_risk_cache
+from app.internal.service.quartile_service import get_map_key_to_quartile
+from app.internal.util.time_util import time_util
+
+
+def rollup_ward_risk(db_session: Session, model: Nb2MosquittoModel, time: int) -> dict[str, WardRiskDaily]:
+    '''predict every ward at the day of time then save number of ward in each rate, return district code map to rollup'''
+    time = time_util.to_start_date_timestamp(time)
+    wards = db_session.query(Ward.location_id, Ward.district_code).where(Ward.location_id.is_not(None)).all()
+    predictions = model.predict_batch(
+        location_ids=[location_id for location_id, _ in wards], date_time=time, db_session=db_session)
+    map_location_id_to_quartile = get_map_key_to_quartile(
+        db_session, {location_id: prediction.count for location_id, prediction in predictions.items()}, time)
+
+    map_district_code_to_counts: dict[str, list[int]] = {CITY_DISTRICT_CODE: [0] * len(COUNT_COLUMNS)}
+    for location_id, district_code in wards:
+        quartile = map_location_id_to_quartile.get(location_id)
+        if quartile is None or quartile < 0:
+            # ward has no weather data to predict
+            continue
+        map_district_code_to_counts[CITY_DISTRICT_CODE][quartile] += 1
+        if district_code is not None:
+            map_district_code_to_counts.setdefault(district_code, [0] * len(COUNT_COLUMNS))[quartile] += 1
+
+    ward_risks = [
+        WardRiskDaily(time=time, district_code=district_code, model_version=model.get_memo_version(),
+                      **dict(zip(COUNT_COLUMNS, counts)))
+        for district_code, counts in map_district_code_to_counts.items()]
+    ward_risk_daily_repo.upsert_all(db_session, ward_risks)
+    logging.info(f"rollup risk of {len(wards)} wards in {len(ward_risks) - 1} districts at {time}")
+    return {ward_risk.district_code: ward_risk for ward_risk in ward_risks}
+
+
+def get_city_rate_counts(db_session: Session, model: Nb2MosquittoModel, time: int) -> dict[str, int]:
+    '''
+    number of ward in each rate of the whole city predicted by model, rollup of the day and model version is computed
+    now if celery has not done it
+    wards are classified with quartile threshold at the last rollup, celery re run it every hour as threshold move
+    '''
+    time = time_util.to_start_date_timestamp(time)
+    model_version = model.get_memo_version()
+    rate_counts = city_ward_risk_cache.get((time, model_version))
+    if rate_counts is not None:
+        return rate_counts
+    ward_risk = ward_risk_daily_repo.get_by_time_and_district(db_session, time, CITY_DISTRICT_CODE, model_version)
+    if ward_risk is None:
+        ward_risk = rollup_ward_risk(db_session, model, time)[CITY_DISTRICT_CODE]
+    rate_counts = {rate: getattr(ward_risk, col) or 0 for rate, col in zip(Rate.__members__, COUNT_COLUMNS)}
+    city_ward_risk_cache.set((time, model_version), rate_counts)
+    return rate_counts
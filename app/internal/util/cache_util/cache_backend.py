@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+import json
+import logging
+import threading
+import time
+from typing import Any, Hashable, Iterable
+
+from app.config import env_var
+from app.internal.util.cache_util.ttl_lru_cache import TTLLRUCache
+
+CACHE_BACKEND_MEMORY = "memory"
+CACHE_BACKEND_REDIS = "redis"
+
+
+class CacheBackend(ABC):
+    '''key value store shared by caches, value must be json serializable so it can be kept out of process'''
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        '''return only keys which are cached'''
+
+    @abstractmethod
+    def set_many(self, mapping: dict[str, Any], ttl: float):
+        pass
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    '''process local backend, also used as fake of redis backend in test'''
+
+    def __init__(self, max_size: int = env_var.CACHE_MEMORY_SIZE) -> None:
+        # ttl is kept per entry so the store itself never expire
+        self._store: TTLLRUCache[str, tuple[float, Any]] = TTLLRUCache(max_size=max_size, ttl=float("inf"))
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        now = time.monotonic()
+        return {key: value for key, (expired_at, value) in self._store.get_many(keys).items() if expired_at >= now}
+
+    def set_many(self, mapping: dict[str, Any], ttl: float):
+        expired_at = time.monotonic() + ttl
+        self._store.set_many({key: (expired_at, value) for key, value in mapping.items()})
+
+    def delete_prefix(self, prefix: str):
+        self._store.delete_many([key for key in self._store.keys() if key.startswith(prefix)])
+
+
+class RedisCacheBackend(CacheBackend):
+    '''shared by every replica, multi get and multi set are sent in one round trip'''
+
+    def __init__(self, url: str = env_var.CACHE_REDIS_URL) -> None:
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        if len(keys) == 0:
+            return {}
+        try:
+            values = self._client.mget(keys)
+        except Exception:
+            # cache is best effort, caller fall back to db
+            logging.exception("get from redis cache failed")
+            return {}
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, mapping: dict[str, Any], ttl: float):
+        if len(mapping) == 0:
+            return
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(key, json.dumps(value), ex=max(1, int(ttl)))
+        try:
+            pipeline.execute()
+        except Exception:
+            logging.exception("set to redis cache failed")
+
+    def delete_prefix(self, prefix: str):
+        try:
+            pipeline = self._client.pipeline(transaction=False)
+            for key in self._client.scan_iter(match=f"{prefix}*", count=1000):
+                pipeline.delete(key)
+            pipeline.execute()
+        except Exception:
+            logging.exception(f"delete {prefix} from redis cache failed")
+
+
+def new_cache_backend(name: str = env_var.CACHE_BACKEND) -> CacheBackend:
+    if name == CACHE_BACKEND_REDIS:
+        return RedisCacheBackend()
+    return InMemoryCacheBackend()
+
+
+class KeyedCache:
+    '''
+    cache of one kind of value on a backend, key is a tuple which is joined into a namespaced string key
+    hit and miss are counted in this process
+    '''
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: float) -> None:
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _to_key(self, key: tuple[Hashable, ...]) -> str:
+        return ":".join([self.namespace] + [str(item) for item in key])
+
+    def get_many(self, keys: Iterable[tuple[Hashable, ...]]) -> dict[tuple[Hashable, ...], Any]:
+        map_str_key_to_key = {self._to_key(key): key for key in keys}
+        values = self.backend.get_many(list(map_str_key_to_key.keys()))
+        # counters are shared by every threadpool worker of this process
+        with self._lock:
+            self.hits += len(values)
+            self.misses += len(map_str_key_to_key) - len(values)
+        return {map_str_key_to_key[str_key]: value for str_key, value in values.items()}
+
+    def get(self, key: tuple[Hashable, ...]) -> Any:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, mapping: dict[tuple[Hashable, ...], Any]):
+        self.backend.set_many({self._to_key(key): value for key, value in mapping.items()}, self.ttl)
+
+    def set(self, key: tuple[Hashable, ...], value: Any):
+        self.set_many({key: value})
+
+    def clear(self):
+        self.backend.delete_prefix(f"{self.namespace}:")
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+cache_backend: CacheBackend = new_cache_backend()
@@ -0,0 +1,87 @@
+from dataclasses import dataclass, field
+import logging
+import threading
+from typing import Any, Callable, Hashable, TypeVar
+
+from app.config import env_var
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Exception = None
+
+
+class SingleFlight:
+    '''
+    concurrent calls of the same key wait for the first one and share its result or error
+    if redis url is set, the first call of each process also take a redis lock so only one process run at a time,
+    fn should check whether the work is already done by another process before doing it
+    '''
+
+    def __init__(self, namespace: str, redis_url: str = None,
+                 lock_timeout: float = env_var.SINGLE_FLIGHT_LOCK_TIMEOUT) -> None:
+        self._namespace = namespace
+        self._lock_timeout = lock_timeout
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url is not None:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+        if not is_leader:
+            if not call.done.wait(self._lock_timeout):
+                logging.info(f"wait {self._namespace} {key} timeout, run it without waiting")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_with_process_lock(key, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _do_with_process_lock(self, key: Hashable, fn: Callable[[], T]) -> T:
+        if self._redis is None:
+            return fn()
+        lock_name = ":".join(["single_flight", self._namespace] + [str(item) for item in
+                                                                   (key if isinstance(key, tuple) else (key,))])
+        lock = self._redis.lock(lock_name, timeout=self._lock_timeout, blocking_timeout=self._lock_timeout)
+        try:
+            is_acquired = lock.acquire()
+        except Exception:
+            logging.exception(f"acquire redis lock {lock_name} failed")
+            is_acquired = False
+        if not is_acquired:
+            # lock is an optimization only, never block the request on it
+            return fn()
+        try:
+            return fn()
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                logging.exception(f"release redis lock {lock_name} failed")
+
+
+def new_single_flight(namespace: str) -> SingleFlight:
+    return SingleFlight(namespace,
+                        redis_url=env_var.CACHE_REDIS_URL if env_var.IS_SINGLE_FLIGHT_ACROSS_PROCESS else None)
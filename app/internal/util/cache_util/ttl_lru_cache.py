@@ -0,0 +1,78 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Generic, Hashable, Iterable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLLRUCache(Generic[K, V]):
+    '''
+    thread safe process local cache, entry expire ttl seconds after it is set
+    least recently used entry is evicted when it has more than max size entries
+    '''
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: K, now: float) -> tuple[bool, V]:
+        '''should be called with lock held'''
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < now:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def get(self, key: K) -> V:
+        '''return None if key is missing or expired'''
+        with self._lock:
+            return self._get(key, time.monotonic())[1]
+
+    def get_many(self, keys: Iterable[K]) -> dict[K, V]:
+        '''return only keys which are cached'''
+        resp: dict[K, V] = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                is_hit, value = self._get(key, now)
+                if is_hit:
+                    resp.update({key: value})
+        return resp
+
+    def set(self, key: K, value: V):
+        self.set_many({key: value})
+
+    def set_many(self, mapping: dict[K, V]):
+        with self._lock:
+            expired_at = time.monotonic() + self._ttl
+            for key, value in mapping.items():
+                self._entries[key] = (expired_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[K]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def keys(self) -> list[K]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,93 @@
+import math
+import random
+from typing import Iterable
+
+import numpy as np
+
+
+class KLLSketch:
+    '''
+    mergeable streaming quantile sketch of Karnin, Lang and Liberty
+    item at level h stands for 2^h input items, a full level is sorted then every other item is promoted to the next
+    level, so memory is O(k) and rank error is about 1.7 / k whatever number of items is added
+    '''
+    _HEADER_DTYPE = np.dtype("<i8")
+    _ITEM_DTYPE = np.dtype("<f8")
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: int = None) -> None:
+        self.k = k
+        self.c = c
+        self.count = 0
+        self._compactors: list[list[float]] = [[]]
+        self._random = random.Random(seed)
+
+    def _get_capacity(self, level: int) -> int:
+        height = len(self._compactors)
+        return int(math.ceil(self.k * self.c ** (height - level - 1))) + 1
+
+    def _get_max_size(self) -> int:
+        return sum(self._get_capacity(level) for level in range(len(self._compactors)))
+
+    def _get_size(self) -> int:
+        return sum(len(compactor) for compactor in self._compactors)
+
+    def _compress(self):
+        while self._get_size() >= self._get_max_size():
+            for level, compactor in enumerate(self._compactors):
+                if len(compactor) < self._get_capacity(level):
+                    continue
+                if level + 1 == len(self._compactors):
+                    self._compactors.append([])
+                compactor.sort()
+                # odd one stays in this level
+                rest = [compactor.pop()] if len(compactor) % 2 == 1 else []
+                self._compactors[level + 1].extend(compactor[self._random.randint(0, 1)::2])
+                self._compactors[level] = rest
+                break
+
+    def update(self, value: float):
+        self.update_many([value])
+
+    def update_many(self, values: Iterable[float]):
+        values = [float(value) for value in values]
+        self._compactors[0].extend(values)
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self._compactors) < len(other._compactors):
+            self._compactors.append([])
+        for level, compactor in enumerate(other._compactors):
+            self._compactors[level].extend(compactor)
+        self.count += other.count
+        self._compress()
+
+    def get_quantiles(self, quantiles: list[float]) -> list[float]:
+        '''empty if nothing is added'''
+        if self.count == 0:
+            return []
+        items = np.concatenate([np.asarray(compactor, dtype=np.float64) for compactor in self._compactors])
+        weights = np.concatenate([np.full(len(compactor), 2 ** level, dtype=np.float64)
+                                  for level, compactor in enumerate(self._compactors)])
+        order = np.argsort(items, kind="stable")
+        cum_weights = np.cumsum(weights[order])
+        idxs = np.searchsorted(cum_weights, np.asarray(quantiles) * cum_weights[-1], side="left")
+        return items[order][np.minimum(idxs, len(items) - 1)].tolist()
+
+    def to_bytes(self) -> bytes:
+        '''k, count, number of level, size of each level then every item as float64'''
+        header = np.array([self.k, self.count, len(self._compactors)] + [len(compactor) for compactor in
+                                                                         self._compactors], dtype=self._HEADER_DTYPE)
+        items = np.array([item for compactor in self._compactors for item in compactor], dtype=self._ITEM_DTYPE)
+        return header.tobytes() + items.tobytes()
+
+    @classmethod
+    def from_bytes(cls, inp: bytes) -> "KLLSketch":
+        k, count, height = np.frombuffer(inp, dtype=cls._HEADER_DTYPE, count=3).tolist()
+        sizes = np.frombuffer(inp, dtype=cls._HEADER_DTYPE, count=height, offset=3*cls._HEADER_DTYPE.itemsize)
+        items = np.frombuffer(inp, dtype=cls._ITEM_DTYPE, offset=(3+height)*cls._HEADER_DTYPE.itemsize).tolist()
+        sketch = cls(k=k)
+        sketch.count = count
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).tolist()
+        sketch._compactors = [items[offsets[level]:offsets[level+1]] for level in range(height)]
+        return sketch
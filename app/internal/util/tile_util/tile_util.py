@@ -0,0 +1,17 @@
+import numpy as np
+
+TILE_SIZE = 256
+
+
+def lng_lat_to_tile_pixel(lngs: np.ndarray, lats: np.ndarray, zoom: int) -> tuple[np.ndarray, np.ndarray, np.ndarray,
+                                                                                 np.ndarray]:
+    '''web mercator tile x, y at zoom and pixel x, y inside that tile of each point'''
+    n = 2 ** zoom
+    lat_rads = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -85.0511, 85.0511))
+    xs = (np.asarray(lngs, dtype=np.float64) + 180) / 360 * n
+    ys = (1 - np.arcsinh(np.tan(lat_rads)) / np.pi) / 2 * n
+    tile_xs = np.clip(np.floor(xs), 0, n - 1).astype(np.int64)
+    tile_ys = np.clip(np.floor(ys), 0, n - 1).astype(np.int64)
+    pixel_xs = np.clip(np.floor((xs - tile_xs) * TILE_SIZE), 0, TILE_SIZE - 1).astype(np.uint8)
+    pixel_ys = np.clip(np.floor((ys - tile_ys) * TILE_SIZE), 0, TILE_SIZE - 1).astype(np.uint8)
+    return tile_xs, tile_ys, pixel_xs, pixel_ys
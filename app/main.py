@@ -9,7 +9,7 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.adapter.base import BaseResponse
-from app.common.exception import ThirdServiceException
+from app.common.exception import ModelNotFoundException, ModelWarmingException, ThirdServiceException
 from app.config import env_var
 from app.middleware.context_middleware import CustomContextMiddleware
 from app.internal.celery.celery import celery_app  # noqa #import this so we can start celery when we start app
@@ -33,6 +33,10 @@ def get_application() -> FastAPI:
     # add known exception handler in future
     app.add_exception_handler(ThirdServiceException, lambda request, e: JSONResponse(status_code=500, content=BaseResponse(
         code=e.code, message="another third party service, retry later or choose another location").json()))
+    app.add_exception_handler(ModelWarmingException, lambda request, e: JSONResponse(status_code=e.code, content=BaseResponse(
+        code=e.code, message="model is warming up, retry later").json()))
+    app.add_exception_handler(ModelNotFoundException, lambda request, e: JSONResponse(status_code=e.code, content=BaseResponse(
+        code=e.code, message="model time window or version does not exist").json()))
     paths = app.openapi().get("paths")
     for path, operations in paths.items():
         for method, metadata in operations.items():
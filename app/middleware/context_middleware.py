@@ -5,6 +5,7 @@ from fastapi.security.utils import get_authorization_scheme_param
 from fastapi import Depends
 from starlette_context.middleware import ContextMiddleware
 
+from app.common.constant import MODEL_TIME_WINDOW_ID_HEADER, MODEL_VERSION_HEADER
 from app.common.context import Context
 from app.internal.dao.db import get_db_session
 from app.common import logger
@@ -22,9 +23,13 @@ class CustomContextMiddleware(ContextMiddleware):
 
         # if scheme.lower() != "bearer":
         #     return dict()
+        model_time_window_id = request.headers.get(MODEL_TIME_WINDOW_ID_HEADER)
         ctx = Context(
             method=request.method,
             logger=logger.get(),
+            # model routing, only used in experiment
+            model_time_window_id=int(model_time_window_id) if (model_time_window_id or "").isdigit() else None,
+            model_version=request.headers.get(MODEL_VERSION_HEADER),
         )
         return {
             "ctx": ctx
@@ -0,0 +1,41 @@
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import statsmodels.formula.api as smf
+
+from app.internal.model.model.constants import NORMAL_COLUMNS, PREDICTED_VAR, RANDOM_FACTOR_COLUMN
+from app.internal.model.model.model import Nb2MosquittoModel
+
+
+def _get_train_df(n_row: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(3112001)
+    df = pd.DataFrame({col: rng.random(n_row) for col in NORMAL_COLUMNS})
+    df[RANDOM_FACTOR_COLUMN] = rng.integers(1, 10, n_row)
+    mu = np.exp(1 + df["temperature"] - df["precipitation"])
+    # negative binomial count with over dispersion so alpha is not trivial
+    df[PREDICTED_VAR] = rng.negative_binomial(n=2, p=2 / (2 + mu))
+    return df[NORMAL_COLUMNS+[PREDICTED_VAR]+[RANDOM_FACTOR_COLUMN]]
+
+
+def _get_alpha_constants_with_patsy(df: pd.DataFrame) -> float:
+    '''previous implementation, row by row apply then fit auxiliary OLS through formula'''
+    poisson = sm.GLM(
+        df[PREDICTED_VAR],
+        df[[col for col in df.columns if str(col) != PREDICTED_VAR]],
+        family=sm.families.Poisson()).fit()
+    train_df = df.copy()
+    train_df["LAMBDA"] = poisson.mu
+    train_df['AUX_OLS_DEP'] = train_df.apply(lambda x: ((x[PREDICTED_VAR] - x['LAMBDA'])
+                                                        ** 2 - x['LAMBDA']) / x['LAMBDA'], axis=1)
+    return smf.ols("""AUX_OLS_DEP ~ LAMBDA - 1""", train_df).fit().params.iloc[0]
+
+
+class TestAlphaConstants:
+
+    def test_match_patsy_ols(self):
+        with patch.object(Nb2MosquittoModel, "load_model"), \
+                patch.object(Nb2MosquittoModel, "get_latest_version", return_value=None):
+            model = Nb2MosquittoModel(1)
+            df = _get_train_df()
+            assert np.isclose(model.get_alpha_constants(df), _get_alpha_constants_with_patsy(df), rtol=1e-9)
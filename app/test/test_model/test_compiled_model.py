@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+import numpy as np
+
+from app.internal.model.model.compiled_model import CompiledModel
+
+
+class TestCompiledModel:
+
+    def test_get_start_params(self):
+        compiled_model = CompiledModel.from_bytes(CompiledModel(
+            feature_names=["Intercept", "temperature"], fe_params=[1, 2], random_effects=[0, 0.1, 0.2],
+            vcp_params=[-1]).to_bytes())
+        # newer data has a new location 3 and location 1 is no longer in training data
+        model = SimpleNamespace(
+            fep_names=["Intercept", "temperature"], k_vcp=1, k_vc=2, ident=np.array([0, 0]),
+            vcp_names=["location_id"], vc_names=["C(location_id)[2]", "C(location_id)[3]"])
+        assert np.allclose(compiled_model.get_start_params(model), [1, 2, -1, 0.2, 0])
+
+    def test_cannot_warm_start_without_vcp_params(self):
+        compiled_model = CompiledModel.from_bytes(CompiledModel(
+            feature_names=["Intercept"], fe_params=[1], random_effects=[0]).to_bytes())
+        assert not compiled_model.can_warm_start()
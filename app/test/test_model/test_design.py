@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from app.internal.model.model.constants import FORMULA, NORMAL_COLUMNS, PREDICTED_VAR, RANDOM_FACTOR_COLUMN, VC_FORMULA
+from app.internal.model.model.design import get_fixed_effect_design, get_random_effect_design
+
+
+class TestDesign:
+
+    def test_match_formula(self):
+        rng = np.random.default_rng(3112001)
+        df = pd.DataFrame({col: rng.random(200) for col in NORMAL_COLUMNS})
+        df[RANDOM_FACTOR_COLUMN] = pd.Categorical(rng.choice([3, 7, 12, 40], 200))
+        df[PREDICTED_VAR] = rng.poisson(3, 200)
+        formula_model = sm.PoissonBayesMixedGLM.from_formula(formula=FORMULA, data=df, vc_formulas=VC_FORMULA)
+
+        exog, fep_names = get_fixed_effect_design(df)
+        exog_vc, ident, vcp_names, vc_names = get_random_effect_design(df)
+
+        assert fep_names == formula_model.fep_names
+        assert vcp_names == formula_model.vcp_names and vc_names == formula_model.vc_names
+        assert np.array_equal(ident, formula_model.ident)
+        assert np.allclose(exog, formula_model.exog)
+        assert np.allclose(exog_vc.toarray(), formula_model.exog_vc.toarray())
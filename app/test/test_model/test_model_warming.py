@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+
+from app.common.exception import ModelWarmingException
+from app.internal.model.model.model import Nb2MosquittoModel
+
+
+class TestModelWarming:
+
+    def test_train_once_in_background(self):
+        is_trained = threading.Event()
+        compiled_model = MagicMock()
+
+        def train(model: Nb2MosquittoModel, *args, **kwargs):
+            is_trained.wait(timeout=5)
+            model.compiled_model = compiled_model
+
+        with patch.object(Nb2MosquittoModel, "load_model"), \
+                patch.object(Nb2MosquittoModel, "get_latest_version", return_value=None), \
+                patch.object(Nb2MosquittoModel, "train", autospec=True, side_effect=train) as mock_train, \
+                patch("app.internal.model.model.model.get_db_session", side_effect=lambda: iter([MagicMock()])):
+            model = Nb2MosquittoModel(1)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                errors = list(executor.map(lambda _: pytest.raises(ModelWarmingException, model.get_model), range(8)))
+            assert len(errors) == 8
+
+            is_trained.set()
+            model._train_thread.join(timeout=5)
+            assert model.get_model() is compiled_model
+            mock_train.assert_called_once()
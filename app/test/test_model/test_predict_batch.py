@@ -0,0 +1,71 @@
+from datetime import datetime
+from unittest.mock import patch
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.adapter.visual_crossing_adapter import GetWeatherLogResponse
+from app.internal.dao.location import Location
+from app.internal.dao.predicted_log import PredictedLog
+from app.internal.dao.weather_log import WeatherLog
+from app.internal.model.model.compiled_model import CompiledModel
+from app.internal.model.model.constants import NORMAL_COLUMNS
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.model.model.prediction_cache import prediction_cache
+from app.internal.model.model.scaler import MaxScaler
+from app.internal.model.model.weather_log_cache import weather_log_cache
+from app.internal.util.time_util import time_util
+
+
+class TestPredictBatch:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        prediction_cache.clear()
+        weather_log_cache.clear()
+        yield clean_db_session_test
+        prediction_cache.clear()
+        weather_log_cache.clear()
+
+    @pytest.fixture
+    def model(self) -> Nb2MosquittoModel:
+        with patch.object(Nb2MosquittoModel, "load_model"), \
+                patch.object(Nb2MosquittoModel, "get_latest_version", return_value=None):
+            model = Nb2MosquittoModel(1)
+        model.compiled_model = CompiledModel(
+            ["Intercept"]+NORMAL_COLUMNS, np.full(len(NORMAL_COLUMNS)+1, 0.1), np.zeros(0))
+        model.scaler = MaxScaler(NORMAL_COLUMNS, np.full(len(NORMAL_COLUMNS), 3.0))
+        return model
+
+    def test_cache_memo_new_and_missing_weather(self, db_session: Session, model: Nb2MosquittoModel):
+        day = time_util.datetime_to_ts(datetime(2023, 6, 1))
+        model_version = model.get_memo_version()
+        db_session.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in range(1, 5)])
+        db_session.flush()
+        # location 1 is cached, 2 is memoized, 3 has weather to predict, 4 has no weather even from third party
+        prediction_cache.set((1, day, model_version), 11.0)
+        db_session.add(PredictedLog(location_id=2, value=22.0, model_version=model_version, predict_time=day))
+        db_session.add(WeatherLog(location_id=3, date_time=day, **{col: 1.5 for col in NORMAL_COLUMNS}))
+        db_session.commit()
+
+        with patch("app.internal.model.model.data_loader.visual_crossing_adapter.get_weather_log",
+                   return_value=GetWeatherLogResponse(code=500)) as get_weather_log:
+            predictions = model.predict_batch([1, 2, 3, 4], day + 3600, db_session)
+        assert get_weather_log.call_count == 1
+        assert sorted(predictions.keys()) == [1, 2, 3]
+        assert predictions[1].count == 11.0 and predictions[2].count == 22.0
+        # features are scaled to 0.5 by max scaler of 3
+        assert np.isclose(predictions[3].count, np.exp(0.1 + 0.1 * 0.5 * len(NORMAL_COLUMNS)))
+
+        predicted_logs = db_session.query(PredictedLog).order_by(PredictedLog.location_id).all()
+        assert [(log.location_id, log.predict_time) for log in predicted_logs] == [(2, day), (3, day)]
+        assert weather_log_cache.get((3, day))["temperature"] == 1.5
+        assert prediction_cache.get_many([(location_id, day, model_version) for location_id in [2, 3, 4]]).keys() == {
+            (2, day, model_version), (3, day, model_version)}
+
+        # weather of a new prediction is read from cache
+        prediction_cache.clear()
+        db_session.query(PredictedLog).delete()
+        db_session.query(WeatherLog).delete()
+        db_session.commit()
+        assert np.isclose(model.predict_batch([3], day, db_session)[3].count, predictions[3].count)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.adapter.visual_crossing_adapter import GetWeatherLogResponse
+from app.common.constant import SUCCESS_STATUS_CODE
+from app.internal.dao.location import Location
+from app.internal.dao.predicted_log import PredictedLog
+from app.internal.dao.weather_log import WeatherLog
+from app.internal.model.model.compiled_model import CompiledModel
+from app.internal.model.model.constants import NORMAL_COLUMNS
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.model.model.prediction_cache import prediction_cache
+from app.internal.model.model.scaler import MaxScaler
+from app.internal.model.model.weather_log_cache import weather_log_cache
+from app.internal.util.time_util import time_util
+
+
+class TestPredictInterval:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        prediction_cache.clear()
+        weather_log_cache.clear()
+        yield clean_db_session_test
+        prediction_cache.clear()
+        weather_log_cache.clear()
+
+    @pytest.fixture
+    def model(self) -> Nb2MosquittoModel:
+        with patch.object(Nb2MosquittoModel, "load_model"), \
+                patch.object(Nb2MosquittoModel, "get_latest_version", return_value=None):
+            model = Nb2MosquittoModel(1)
+        model.compiled_model = CompiledModel(
+            ["Intercept"]+NORMAL_COLUMNS, np.full(len(NORMAL_COLUMNS)+1, 0.1), np.zeros(0))
+        model.scaler = MaxScaler(NORMAL_COLUMNS, np.full(len(NORMAL_COLUMNS), 3.0))
+        return model
+
+    def test_match_predict_batch(self, db_session: Session, model: Nb2MosquittoModel):
+        days = [time_util.datetime_to_ts(datetime(2023, 6, 1) + timedelta(idx)) for idx in range(4)]
+        db_session.add(Location(id=1, longitude=106.7, latitude=10.8))
+        db_session.add_all([WeatherLog(location_id=1, date_time=day, **{col: float(idx) for col in NORMAL_COLUMNS})
+                            for idx, day in enumerate(days)])
+        db_session.commit()
+        # memoized prediction of a day is served as is
+        model.predict_batch([1], days[1], db_session)
+
+        with patch.object(model.data_loader, "get_history_input_data_grid",
+                          wraps=model.data_loader.get_history_input_data_grid) as get_input:
+            predictions = model.predict_interval(
+                location_id=1, start_time=days[0] + 3600, end_time=days[-1] + 3600 + 86400, db_session=db_session)
+        assert get_input.call_count == 1
+        assert get_input.call_args.args[2] == [days[0], days[2], days[3]]
+        assert list(predictions.keys()) == [day + 3600 for day in days]
+
+        prediction_cache.clear()
+        db_session.query(PredictedLog).delete()
+        db_session.commit()
+        for day in days:
+            assert np.isclose(predictions[day + 3600].count, model.predict_batch([1], day, db_session)[1].count)
+
+    def test_grid_leave_out_location_without_weather(self, db_session: Session, model: Nb2MosquittoModel):
+        days = [time_util.datetime_to_ts(datetime(2023, 6, 1) + timedelta(idx)) for idx in range(3)]
+        db_session.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in [1, 2]])
+        db_session.add_all([WeatherLog(location_id=1, date_time=day, **{col: float(idx) for col in NORMAL_COLUMNS})
+                            for idx, day in enumerate(days)])
+        db_session.commit()
+
+        with patch("app.internal.model.model.data_loader.visual_crossing_adapter.get_weather_log_in_range",
+                   return_value=GetWeatherLogResponse(code=SUCCESS_STATUS_CODE, data=[])):
+            predictions = model.predict_grid(
+                location_ids=[1, 2], start_time=days[0], end_time=days[-1] + 86400, db_session=db_session)
+        assert list(predictions.keys()) == [(1, day) for day in days]
+        assert db_session.query(PredictedLog).count() == len(days)
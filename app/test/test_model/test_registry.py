@@ -0,0 +1,71 @@
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pytest
+
+from app.adapter.file_service import file_service_adapter
+from app.common.exception import ModelNotFoundException, ModelWarmingException
+from app.internal.model.model.compiled_model import CompiledModel
+from app.internal.model.model.model import Nb2MosquittoModel
+from app.internal.model.model.registry import ModelRegistry
+
+
+class TestModelRegistry:
+
+    @pytest.fixture
+    def file_service(self):
+        file_service = MagicMock()
+        file_service.get_file_content.return_value = b"v1"
+
+        def load_model(model: Nb2MosquittoModel):
+            # 800 bytes model
+            model.compiled_model = CompiledModel(feature_names=["Intercept"], fe_params=[1], random_effects=np.zeros(99))
+
+        with patch.object(Nb2MosquittoModel, "load_model", autospec=True, side_effect=load_model), \
+                patch.object(file_service_adapter, "file_service", file_service):
+            yield file_service
+
+    def test_reload_swap_to_latest_version(self, file_service: MagicMock):
+        registry = ModelRegistry()
+        old_model = registry.get(1)
+        assert old_model.version == "v1" and old_model.compiled_file_path == "model/1/v1.npz"
+        assert not registry.reload(1)
+
+        file_service.get_file_content.return_value = b"v2"
+        assert registry.reload(1)
+        assert registry.get(1).version == "v2"
+        # request holding old model still predict with old version, and it can still be routed to
+        assert old_model.version == "v1"
+        assert registry.get(1, "v1") is old_model
+
+    def test_evict_least_recently_used(self, file_service: MagicMock):
+        registry = ModelRegistry(memory_budget=2000)
+        first_model = registry.get(1)
+        registry.get(2)
+        assert registry.get(1) is first_model
+        registry.get(3)
+        # time window 2 is least recently used
+        assert registry.get_memory_size() <= 2000
+        assert registry.get(1) is first_model
+        assert {key[0] for key in registry._models.keys()} == {1, 3}
+
+    def test_unknown_version_not_pooled(self, file_service: MagicMock):
+        registry = ModelRegistry()
+        with patch.object(Nb2MosquittoModel, "load_model"), \
+                patch.object(Nb2MosquittoModel, "train_in_background") as train_in_background:
+            with pytest.raises(ModelNotFoundException):
+                registry.get(1, "bogus")
+            # time window without any artifact yet is shared for its background training but not pooled
+            file_service.get_file_content.return_value = b""
+            warming_model = registry.get(2)
+            assert registry.get(2) is warming_model
+            with pytest.raises(ModelWarmingException):
+                warming_model.get_model()
+        assert train_in_background.call_count == 1
+        assert registry.get_memory_size() == 0 and len(registry._models) == 0
+
+        # trained model is pooled under its new version
+        warming_model.set_version("v2")
+        warming_model.compiled_model = CompiledModel(
+            feature_names=["Intercept"], fe_params=[1], random_effects=np.zeros(0))
+        assert registry.get(2) is warming_model
+        assert list(registry._models.keys()) == [(2, "v2")] and registry.get(2, "v2") is warming_model
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from app.internal.dao.weather_log import WeatherLog
+from app.internal.model.model.constants import NORMAL_COLUMNS
+from app.internal.model.model.data_loader import WeatherDataLoader
+from app.internal.model.model.scaler import MaxScaler
+
+
+class TestMaxScaler:
+
+    def test_scale_single_row_by_training_max(self):
+        rng = np.random.default_rng(3112001)
+        train_df = pd.DataFrame({col: rng.random(50) * 40 for col in NORMAL_COLUMNS})
+        scaler = MaxScaler.from_bytes(MaxScaler(NORMAL_COLUMNS).fit(train_df).to_bytes())
+        train_max = train_df[NORMAL_COLUMNS].max().to_numpy()
+
+        weather_log = WeatherLog(location_id=1, date_time=0, **{col: 10.0 for col in NORMAL_COLUMNS})
+        df = WeatherDataLoader().get_history_input_df(None, weather_log, scaler)
+        assert len(df) == 1
+        # one row used to be scaled by its own max so every feature became 1
+        assert np.allclose(df[NORMAL_COLUMNS].to_numpy()[0], 10.0 / train_max)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.internal.dao.location import Location
+from app.internal.dao.predicted_var import PredictedVar
+from app.internal.dao.time_window import TimeWindow
+from app.internal.dao.weather_log import WeatherLog
+from app.internal.model.model.constants import NORMAL_COLUMNS, PREDICTED_VAR, RANDOM_FACTOR_COLUMN
+from app.internal.model.model.data_loader import WeatherDataLoader
+from app.internal.model.model.scaler import MaxScaler
+
+
+class TestTrainDataLoader:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        db_session = clean_db_session_test
+        db_session.add_all([TimeWindow(id=idx, sliding_size=1) for idx in [1, 2]])
+        db_session.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in range(1, 4)])
+        db_session.flush()
+        rng = np.random.default_rng(3112001)
+        for time_window_id in [1, 2]:
+            for location_id in range(1, 4):
+                for day in range(10):
+                    db_session.add(WeatherLog(
+                        location_id=location_id, time_window_id=time_window_id, date_time=day*86400,
+                        **{col: None if rng.random() < 0.1 else rng.random()*40 for col in NORMAL_COLUMNS}))
+                    if day % 2 == 0:
+                        db_session.add(PredictedVar(location_id=location_id, time_window_id=time_window_id,
+                                                    date_time=day*86400, value=int(rng.integers(0, 50))))
+        # predicted var without value is not a label
+        db_session.add(PredictedVar(location_id=1, time_window_id=1, date_time=86400, value=None))
+        db_session.commit()
+        return db_session
+
+    def test_stream_train_data_match_read_all(self, db_session: Session):
+        data_loader = WeatherDataLoader()
+        df = data_loader.get_train_data(db_session, 1, MaxScaler(NORMAL_COLUMNS))
+        streamed_df = data_loader.stream_train_data(
+            db_session, 1, data_loader.fit_scaler(db_session, 1), chunk_size=4)
+
+        assert len(df) == 15
+        assert streamed_df[NORMAL_COLUMNS].dtypes.eq(np.float32).all()
+        columns = NORMAL_COLUMNS+[PREDICTED_VAR]+[RANDOM_FACTOR_COLUMN]
+        assert np.allclose(df[columns].to_numpy(dtype=np.float64), streamed_df[columns].to_numpy(dtype=np.float64),
+                           rtol=1e-6)
@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock, patch
+import pytest
+
+from app.adapter.file_service import file_service_adapter
+from app.internal.model.model.fingerprint import TrainDataFingerprint
+from app.internal.model.model.model import Nb2MosquittoModel
+
+
+def _get_fingerprint(weather_log_count: int = 10) -> TrainDataFingerprint:
+    return TrainDataFingerprint(weather_log_count=weather_log_count, weather_log_max_updated_at=100,
+                                predicted_var_count=10, predicted_var_max_updated_at=100)
+
+
+class TestTrainFingerprint:
+
+    @pytest.fixture
+    def model(self):
+        file_service = MagicMock()
+        file_service.get_file_content.return_value = _get_fingerprint().to_bytes()
+        with patch.object(Nb2MosquittoModel, "load_model"), \
+                patch.object(file_service_adapter, "file_service", file_service):
+            model = Nb2MosquittoModel(1)
+            model.compiled_model = MagicMock()
+            yield model
+
+    def test_skip_when_unchanged(self, model: Nb2MosquittoModel):
+        with patch.object(model.data_loader, "get_train_data_fingerprint", return_value=_get_fingerprint()), \
+                patch.object(model.data_loader, "get_train_data") as get_train_data:
+            assert model.train(MagicMock()) is None
+            get_train_data.assert_not_called()
+
+    @pytest.mark.parametrize("is_force, weather_log_count", [(True, 10), (False, 11)])
+    def test_retrain(self, model: Nb2MosquittoModel, is_force: bool, weather_log_count: int):
+        with patch.object(model.data_loader, "get_train_data_fingerprint",
+                          return_value=_get_fingerprint(weather_log_count)), \
+                patch.object(model.data_loader, "get_train_data", side_effect=RuntimeError) as get_train_data:
+            with pytest.raises(RuntimeError):
+                model.train(MagicMock(), is_force=is_force)
+            get_train_data.assert_called_once()
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy.orm import Session
+
+from app.adapter.visual_crossing_adapter import GetWeatherLogResponse, GetWeatherLogResponseData
+from app.common.constant import SUCCESS_STATUS_CODE
+from app.internal.dao.location import Location
+from app.internal.dao.weather_log import WeatherLog
+from app.internal.model.model.data_loader import get_or_fetch_weather_logs
+from app.internal.util.time_util import time_util
+
+
+def _get_range_resp(req) -> GetWeatherLogResponse:
+    start_date = time_util.ts_to_datetime(req.start_date_time)
+    days = (time_util.ts_to_datetime(req.end_date_time) - start_date).days + 1
+    return GetWeatherLogResponse(code=SUCCESS_STATUS_CODE, data=[
+        GetWeatherLogResponseData(date_time=start_date + timedelta(idx), temperature="30") for idx in range(days)])
+
+
+class TestWeatherRangeFetch:
+
+    def test_fetch_contiguous_gap_once(self, clean_db_session_test: Session):
+        db_session = clean_db_session_test
+        location = Location(id=1, longitude=106.7, latitude=10.8)
+        db_session.add(location)
+        days = [time_util.datetime_to_ts(datetime(2023, 6, 1) + timedelta(idx)) for idx in range(10)]
+        # day 0, 4 and 5 are in db, gaps are 1-3 and 6-9
+        db_session.add_all([WeatherLog(location_id=1, date_time=days[idx], temperature=25) for idx in [0, 4, 5]])
+        db_session.commit()
+
+        with patch("app.internal.model.model.data_loader.visual_crossing_adapter.get_weather_log_in_range",
+                   side_effect=_get_range_resp) as get_weather_log_in_range:
+            map_day_to_weather_log = get_or_fetch_weather_logs(db_session, location, [day + 3600 for day in days])
+        assert get_weather_log_in_range.call_count == 2
+        assert sorted(map_day_to_weather_log.keys()) == days
+        assert [map_day_to_weather_log[day].temperature for day in days] == [25, 30, 30, 30, 25, 25, 30, 30, 30, 30]
+        assert db_session.query(WeatherLog).count() == 10
+
+        with patch("app.internal.model.model.data_loader.visual_crossing_adapter.get_weather_log_in_range",
+                   side_effect=_get_range_resp) as get_weather_log_in_range:
+            get_or_fetch_weather_logs(db_session, location, days)
+        assert get_weather_log_in_range.call_count == 0
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app.internal.dao.location import Location
+from app.internal.dao.predicted_log import PredictedLog
+from app.internal.dao.prediction_quartile import PredictionQuartile
+from app.internal.repository.predicted_log import predicted_log_repo
+from app.internal.util.sketch_util.kll_sketch import KLLSketch
+
+
+def _get_predicted_log(location_id: int, value: float, predict_time: int = 86400) -> PredictedLog:
+    return PredictedLog(location_id=location_id, value=value, model_file_path="model/1/v1.pkl", model_version="v1",
+                        predict_time=predict_time)
+
+
+class TestPredictedLogRepo:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        clean_db_session_test.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in range(3)])
+        clean_db_session_test.commit()
+        return clean_db_session_test
+
+    def test_memo(self, db_session: Session):
+        predicted_log_repo.insert_ignore_conflict(db_session, [_get_predicted_log(idx, idx) for idx in range(3)])
+        # same memo key as one already in db is skipped
+        predicted_log_repo.insert_ignore_conflict(db_session, [_get_predicted_log(1, 9), _get_predicted_log(1, 9, 0)])
+
+        predicted_logs = predicted_log_repo.get_by_memo_keys(
+            db_session, [(1, 86400, "v1"), (2, 86400, "v1"), (1, 0, "v1"), (2, 86400, "v2")])
+        assert sorted((log.location_id, log.predict_time, log.value) for log in predicted_logs) == [
+            (1, 0, 9), (1, 86400, 1), (2, 86400, 2)]
+        assert db_session.query(PredictedLog).count() == 4
+        assert all(log.created_at is not None for log in predicted_logs)
+        # skipped log is not counted in quartile sketch
+        quartile = db_session.query(PredictionQuartile).where(PredictionQuartile.time == 86400).one()
+        assert KLLSketch.from_bytes(quartile.sketch).count == 3
+        assert quartile.quartile_threshold == [0, 1, 2]
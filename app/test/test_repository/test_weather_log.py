@@ -0,0 +1,23 @@
+from sqlalchemy.orm import Session
+
+from app.internal.dao.location import Location
+from app.internal.dao.weather_log import WeatherLog
+from app.internal.repository.weather_log import weather_log_repo
+
+
+class TestWeatherLogRepo:
+
+    def test_get_latest(self, clean_db_session_test: Session):
+        db_session = clean_db_session_test
+        db_session.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in range(1, 4)])
+        db_session.flush()
+        db_session.add_all([WeatherLog(location_id=location_id, date_time=date_time, temperature=location_id*10+date_time,
+                                       precipitation=date_time)
+                            for location_id in range(1, 4) for date_time in [2, 0, 1]])
+        db_session.commit()
+
+        weather_logs = weather_log_repo.get_latest_by_location_ids(
+            db_session, [1, 2, 4], columns=["temperature", "precipitation"])
+        assert sorted((log.location_id, log.temperature, log.precipitation) for log in weather_logs) == [
+            (1, 12, 2), (2, 22, 2)]
+        assert weather_log_repo.get_latest_by_location_ids(db_session, []) == []
@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.internal.dao.heatmap_tile import HeatmapTile
+from app.internal.dao.location import Location
+from app.internal.dao.ward import Ward
+from app.internal.model.model.output import MosquittoNormalOutput
+from app.internal.service.cache import heatmap_tile_cache
+from app.internal.service.heatmap_service import decode_tile, encode_tile, get_heatmap_tile, render_heatmap_tiles
+from app.internal.util.tile_util.tile_util import lng_lat_to_tile_pixel
+from app.internal.util.time_util import time_util
+
+
+class TestHeatmapService:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        db_session = clean_db_session_test
+        # location 1 and 2 are a few meters apart, location 3 is in another tile at zoom 12
+        db_session.add_all([Location(id=1, longitude=106.70, latitude=10.77),
+                            Location(id=2, longitude=106.70001, latitude=10.77001),
+                            Location(id=3, longitude=106.60, latitude=10.85)])
+        db_session.flush()
+        db_session.add_all([Ward(location_code=f"w{idx}", location_id=idx) for idx in range(1, 4)])
+        db_session.commit()
+        heatmap_tile_cache.clear()
+        yield db_session
+        heatmap_tile_cache.clear()
+
+    def test_tile_pixel(self):
+        tile_xs, tile_ys, pixel_xs, pixel_ys = lng_lat_to_tile_pixel(np.array([0.0, -180.0]), np.array([0.0, 85.0]), 1)
+        assert tile_xs.tolist() == [1, 0] and tile_ys.tolist() == [1, 0]
+        assert pixel_xs.tolist() == [0, 0] and pixel_ys[0] == 0
+
+    def test_encode_tile(self):
+        records = decode_tile(encode_tile(np.array([3, 1, 3]), np.array([2, 5, 2]), np.array([1.0, 2.0, 4.0])))
+        assert [(record["x"], record["y"], record["weight"]) for record in records] == [(3, 2, 5.0), (1, 5, 2.0)]
+
+    def test_render(self, db_session: Session):
+        day = time_util.to_start_date_timestamp(86400 * 3)
+        model = MagicMock()
+        model.predict_batch.return_value = {1: MosquittoNormalOutput(count=3), 2: MosquittoNormalOutput(count=5),
+                                            3: MosquittoNormalOutput(count=4)}
+        tiles = render_heatmap_tiles(db_session, model, day, min_zoom=12, max_zoom=12)
+        assert len(tiles) == 2
+
+        tile_xs, tile_ys, _, _ = lng_lat_to_tile_pixel(np.array([106.70]), np.array([10.77]), 12)
+        data, etag = get_heatmap_tile(db_session, day + 3600, 12, int(tile_xs[0]), int(tile_ys[0]))
+        # weight is shifted by min prediction like prediction api, near locations fall in one pixel
+        assert decode_tile(data)["weight"].tolist() == [1.0 + 3.0]
+        assert etag.startswith('"')
+        assert get_heatmap_tile(db_session, day, 12, 0, 0) is None
+
+        # rerun of the same day replace its tiles
+        render_heatmap_tiles(db_session, model, day, min_zoom=12, max_zoom=12)
+        assert db_session.query(HeatmapTile).count() == 2
@@ -0,0 +1,37 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.api.request.get_prediction_grid_request import GetPredictionGridRequest
+from app.api.request.get_summary_request import Location as LocationRequest
+from app.common.context import Context
+from app.config import env_var
+from app.internal.dao.location import Location
+from app.internal.service.common import find_locations_by_long_lat
+
+
+class TestLocationLookup:
+
+    def test_find_locations_by_long_lat(self, clean_db_session_test: Session):
+        db_session = clean_db_session_test
+        known_location = Location(longitude=106.7, latitude=10.8)
+        db_session.add(known_location)
+        db_session.commit()
+        ctx = Context()
+        ctx.attach_db_session(db_session)
+
+        locations = find_locations_by_long_lat(ctx, [
+            LocationRequest(lng=106.7, lat=10.8), LocationRequest(lng=106.6, lat=10.9),
+            LocationRequest(location_code="w1"), LocationRequest(lng=106.6, lat=10.9)])
+        assert locations[0].id == known_location.id and locations[2] is None
+        # duplicated new coordinate is created once
+        assert locations[1].id is not None and locations[1] is locations[3]
+        assert db_session.query(Location).count() == 2
+
+    def test_grid_request_caps(self):
+        with pytest.raises(ValidationError):
+            GetPredictionGridRequest(locations=[LocationRequest(location_code="w")] * (
+                env_var.PREDICTION_GRID_MAX_LOCATIONS + 1))
+        with pytest.raises(ValidationError):
+            GetPredictionGridRequest(start_time=0, end_time=86400 * (env_var.PREDICTION_GRID_MAX_DAYS + 1))
+        GetPredictionGridRequest(start_time=0, end_time=86400 * env_var.PREDICTION_GRID_MAX_DAYS)
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.internal.dao.location import Location
+from app.internal.dao.predicted_log import PredictedLog
+from app.internal.dao.prediction_quartile import PredictionQuartile
+from app.internal.repository.predicted_log import predicted_log_repo
+from app.internal.repository.prediction_quartile import prediction_quartile_repo
+from app.internal.service.cache import quartile_cache
+from app.internal.service.quartile_service import classify_quartile, get_quartile_threshold
+from app.internal.util.time_util import time_util
+
+
+def _classify_with_loop(quartile_threshold: list[float], prediction: float) -> int:
+    '''previous implementation, one prediction at a time'''
+    for idx, thrs in enumerate(quartile_threshold):
+        if prediction < thrs:
+            return idx
+    return len(quartile_threshold) - 1
+
+
+class TestQuartileService:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        clean_db_session_test.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in range(130)])
+        clean_db_session_test.commit()
+        quartile_cache.clear()
+        yield clean_db_session_test
+        quartile_cache.clear()
+
+    def test_classify_match_loop(self):
+        quartile_threshold = [1.0, 2.0, 3.0]
+        predictions = [0.5, 1.0, 1.5, 2.0, 3.0, 4.0]
+        assert classify_quartile(quartile_threshold, predictions).tolist() == [
+            _classify_with_loop(quartile_threshold, prediction) for prediction in predictions]
+        assert classify_quartile([], predictions).tolist() == [-1] * len(predictions)
+
+    def test_follow_new_prediction(self, db_session: Session):
+        day = time_util.to_start_date_timestamp(86400 * 3)
+        values = np.arange(1, 11, dtype=np.float64)
+        # prediction written before sketch exist is counted once when the sketch is built
+        db_session.add_all([PredictedLog(location_id=idx, value=value, model_version="v1", predict_time=day)
+                            for idx, value in enumerate(values)])
+        db_session.commit()
+        assert get_quartile_threshold(db_session, day) == np.quantile(values, [0.25, 0.5, 0.75], method="inverted_cdf").tolist()
+
+        new_values = np.arange(11, 31, dtype=np.float64)
+        predicted_log_repo.insert_ignore_conflict(
+            db_session, [PredictedLog(location_id=100+idx, value=value, model_version="v1", predict_time=day)
+                         for idx, value in enumerate(new_values)])
+        quartile_cache.clear()
+        assert get_quartile_threshold(db_session, day) == np.quantile(
+            np.concatenate([values, new_values]), [0.25, 0.5, 0.75], method="inverted_cdf").tolist()
+        assert db_session.query(PredictionQuartile).count() == 1
+        # day without prediction is read only
+        assert get_quartile_threshold(db_session, day + 86400) == []
+        assert db_session.query(PredictionQuartile).count() == 1
+
+    def test_lock_days_in_order(self, db_session: Session):
+        days = [time_util.to_start_date_timestamp(86400 * idx) for idx in [5, 3, 4]]
+        # grid writer insert location by location, so its days are not ordered
+        predicted_logs = [PredictedLog(location_id=1, value=1.0, model_version="v1", predict_time=day) for day in days]
+        with patch.object(prediction_quartile_repo, "_get_for_update",
+                          wraps=prediction_quartile_repo._get_for_update) as get_for_update:
+            predicted_log_repo.insert_ignore_conflict(db_session, predicted_logs)
+        assert [call.args[1] for call in get_for_update.call_args_list] == sorted(days)
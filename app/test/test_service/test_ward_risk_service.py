@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock, patch
+import pytest
+from sqlalchemy.orm import Session
+
+from app.internal.dao.district import District
+from app.internal.dao.location import Location
+from app.internal.dao.ward import Ward
+from app.internal.dao.ward_risk_daily import CITY_DISTRICT_CODE, WardRiskDaily
+from app.internal.model.model.output import MosquittoNormalOutput
+from app.internal.service.cache import city_ward_risk_cache
+from app.internal.service.ward_risk_service import get_city_rate_counts, rollup_ward_risk
+from app.internal.util.time_util import time_util
+
+
+class TestWardRiskService:
+
+    @pytest.fixture
+    def db_session(self, clean_db_session_test: Session):
+        db_session = clean_db_session_test
+        db_session.add_all([Location(id=idx, longitude=106.7, latitude=10.8) for idx in range(1, 6)])
+        db_session.add_all([District(location_code=f"d{idx}") for idx in range(2)])
+        db_session.flush()
+        db_session.add_all([Ward(location_code=f"w{idx}", location_id=idx, district_code=f"d{idx % 2}")
+                            for idx in range(1, 6)])
+        db_session.commit()
+        city_ward_risk_cache.clear()
+        yield db_session
+        city_ward_risk_cache.clear()
+
+    @pytest.fixture
+    def model(self):
+        model = MagicMock()
+        # ward of location 5 has no weather data
+        model.predict_batch.return_value = {idx: MosquittoNormalOutput(count=idx) for idx in range(1, 5)}
+        model.get_memo_version.return_value = "v1"
+        return model
+
+    def test_rollup(self, db_session: Session, model: MagicMock):
+        day = time_util.to_start_date_timestamp(86400 * 3)
+        with patch("app.internal.service.ward_risk_service.get_map_key_to_quartile",
+                   side_effect=lambda _, predictions, __: {key: int(value) - 1 for key, value in predictions.items()}):
+            rollup_ward_risk(db_session, model, day)
+            # rerun of the same day replace the rollup
+            rollup_ward_risk(db_session, model, day)
+
+        map_district_code_to_count = {
+            ward_risk.district_code: (ward_risk.safe_count, ward_risk.normal_count, ward_risk.low_risk_count,
+                                      ward_risk.high_risk_count)
+            for ward_risk in db_session.query(WardRiskDaily).all()}
+        assert map_district_code_to_count == {CITY_DISTRICT_CODE: (1, 1, 1, 1), "d0": (0, 1, 0, 1), "d1": (1, 0, 1, 0)}
+
+        assert get_city_rate_counts(db_session, model, day + 3600) == {
+            "SAFE": 1, "NORMAL": 1, "LOW_RISK": 1, "HIGH_RISK": 1}
+        assert model.predict_batch.call_count == 2
+
+    def test_rollup_per_model_version(self, db_session: Session, model: MagicMock):
+        day = time_util.to_start_date_timestamp(86400 * 3)
+        experiment_model = MagicMock()
+        experiment_model.predict_batch.return_value = {idx: MosquittoNormalOutput(count=4) for idx in range(1, 6)}
+        experiment_model.get_memo_version.return_value = "v2"
+        with patch("app.internal.service.ward_risk_service.get_map_key_to_quartile",
+                   side_effect=lambda _, predictions, __: {key: int(value) - 1 for key, value in predictions.items()}):
+            # experiment model come first, its counts are not served to default model
+            assert get_city_rate_counts(db_session, experiment_model, day) == {
+                "SAFE": 0, "NORMAL": 0, "LOW_RISK": 0, "HIGH_RISK": 5}
+            assert get_city_rate_counts(db_session, model, day) == {
+                "SAFE": 1, "NORMAL": 1, "LOW_RISK": 1, "HIGH_RISK": 1}
+        assert db_session.query(WardRiskDaily).where(WardRiskDaily.district_code == CITY_DISTRICT_CODE).count() == 2
@@ -0,0 +1,21 @@
+from app.internal.celery.train_model.constants import TRAIN_STATUS_FAILED, TRAIN_STATUS_SUCCESS
+from app.internal.celery.train_model.train import aggregate_train_report, split_time_window_ids
+
+
+class TestTrainModel:
+
+    def test_split_time_window_ids(self):
+        chunks = split_time_window_ids(list(range(1, 11)), 4)
+        assert len(chunks) == 4
+        assert sorted(time_window_id for chunk in chunks for time_window_id in chunk) == list(range(1, 11))
+        assert split_time_window_ids([1, 2], 4) == [[1], [2]]
+        assert split_time_window_ids([], 4) == []
+
+    def test_aggregate_train_report(self):
+        report = aggregate_train_report([
+            dict(time_window_id=2, status=TRAIN_STATUS_SUCCESS, started_at=1, finished_at=3, wall_time=2),
+            dict(time_window_id=1, status=TRAIN_STATUS_FAILED, started_at=0, finished_at=2, wall_time=2, error="e"),
+        ])
+        assert [report.time_window_id for report in report.time_window_reports] == [1, 2]
+        assert report.wall_time == 3
+        assert report.success_count == 1 and report.failed_count == 1
@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from app.internal.util.cache_util.cache_backend import InMemoryCacheBackend, KeyedCache
+
+
+class TestKeyedCache:
+
+    def test_get_set_many(self):
+        backend = InMemoryCacheBackend(max_size=10)
+        prediction_cache = KeyedCache(backend, "prediction", ttl=60)
+        quartile_cache = KeyedCache(backend, "quartile", ttl=60)
+        prediction_cache.set_many({(1, 100, "v1"): 1.5, (2, 100, "v1"): 2.5})
+        quartile_cache.set((100,), [1.0, 2.0, 3.0])
+
+        assert prediction_cache.get_many([(1, 100, "v1"), (1, 100, "v2")]) == {(1, 100, "v1"): 1.5}
+        assert quartile_cache.get((100,)) == [1.0, 2.0, 3.0]
+        assert prediction_cache.get_stats() == {"hits": 1, "misses": 1}
+
+        prediction_cache.clear()
+        assert prediction_cache.get((2, 100, "v1")) is None
+        assert quartile_cache.get((100,)) == [1.0, 2.0, 3.0]
+
+    def test_expire_after_ttl(self):
+        prediction_cache = KeyedCache(InMemoryCacheBackend(max_size=10), "prediction", ttl=60)
+        with patch("app.internal.util.cache_util.cache_backend.time.monotonic", return_value=0):
+            prediction_cache.set((1, 100, "v1"), 1.5)
+        with patch("app.internal.util.cache_util.cache_backend.time.monotonic", return_value=61):
+            assert prediction_cache.get((1, 100, "v1")) is None
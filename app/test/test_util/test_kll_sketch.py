@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.internal.util.sketch_util.kll_sketch import KLLSketch
+
+
+def _get_ranks(values: np.ndarray, quantiles: list[float]) -> np.ndarray:
+    return np.array([np.mean(values <= quantile) for quantile in quantiles])
+
+
+class TestKLLSketch:
+
+    def test_quantile_within_rank_error(self):
+        values = np.random.default_rng(3112001).lognormal(size=100000)
+        sketch = KLLSketch(seed=1)
+        for chunk in np.array_split(values, 1000):
+            sketch.update_many(chunk)
+        assert np.allclose(_get_ranks(values, sketch.get_quantiles([0.25, 0.5, 0.75])), [0.25, 0.5, 0.75], atol=0.01)
+        # memory does not grow with number of values
+        assert len(sketch.to_bytes()) < 8 * 1000
+
+    def test_merge_and_serialize(self):
+        values = np.random.default_rng(3112001).random(50000)
+        sketch = KLLSketch(seed=1)
+        sketch.update_many(values[:20000])
+        other = KLLSketch(seed=2)
+        other.update_many(values[20000:])
+        sketch = KLLSketch.from_bytes(sketch.to_bytes())
+        sketch.merge(other)
+        assert sketch.count == len(values)
+        assert np.allclose(_get_ranks(values, sketch.get_quantiles([0.25, 0.5, 0.75])), [0.25, 0.5, 0.75], atol=0.01)
+        assert KLLSketch().get_quantiles([0.5]) == []
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from app.internal.util.cache_util.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+
+    def test_coalesce_concurrent_call(self):
+        single_flight = SingleFlight("test")
+        call_count = 0
+        count_lock = threading.Lock()
+
+        def fetch() -> int:
+            nonlocal call_count
+            with count_lock:
+                call_count += 1
+            time.sleep(0.2)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: single_flight.do((1, 100), fetch), range(8)))
+        assert results == [42] * 8
+        assert call_count == 1
+        # finished flight is forgotten, next call run again
+        assert single_flight.do((1, 100), fetch) == 42
+        assert call_count == 2
+
+    def test_share_error(self):
+        single_flight = SingleFlight("test")
+
+        def fetch():
+            time.sleep(0.2)
+            raise ValueError("third party down")
+
+        def call(_):
+            try:
+                single_flight.do((1, 100), fetch)
+            except ValueError as e:
+                return e
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            errors = list(executor.map(call, range(4)))
+        assert len(set(id(error) for error in errors)) == 1
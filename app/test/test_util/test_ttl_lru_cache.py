@@ -0,0 +1,22 @@
+from unittest.mock import patch
+
+from app.internal.util.cache_util.ttl_lru_cache import TTLLRUCache
+
+
+class TestTTLLRUCache:
+
+    def test_evict_least_recently_used(self):
+        cache = TTLLRUCache(max_size=2, ttl=60)
+        cache.set_many({1: "a", 2: "b"})
+        assert cache.get(1) == "a"
+        cache.set(3, "c")
+        assert cache.get_many([1, 2, 3]) == {1: "a", 3: "c"}
+        assert cache.get_stats() == {"hits": 3, "misses": 1, "size": 2}
+
+    def test_expire_after_ttl(self):
+        cache = TTLLRUCache(max_size=2, ttl=60)
+        with patch("app.internal.util.cache_util.ttl_lru_cache.time.monotonic", return_value=0):
+            cache.set(1, "a")
+        with patch("app.internal.util.cache_util.ttl_lru_cache.time.monotonic", return_value=61):
+            assert cache.get(1) is None
+        assert cache.get_stats() == {"hits": 0, "misses": 1, "size": 0}